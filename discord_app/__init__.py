@@ -4,6 +4,8 @@
 from __future__             import annotations
 from datetime               import datetime
 from zoneinfo               import ZoneInfo
+from typing                 import Any, Awaitable, Callable
+import                             asyncio
 import                             io
 import                             os
 
@@ -12,6 +14,7 @@ import                             httpx
 import                             discord
 
 from discord_app.df_state   import DFState
+from discord_app            import api_calls
 
 DF_GUILD_ID = int(os.environ['DF_GUILD_ID'])
 DF_CHANNEL_ID = int(os.environ['DF_CHANNEL_ID'])
@@ -37,6 +40,11 @@ OORI_RED = (138, 43, 43)
 
 MOUNTAIN_TIME = ZoneInfo('America/Denver')
 
+# Embed branding images by URL (letting Discord fetch them) instead of attaching our cached copy to every message
+EMBED_IMAGES_BY_URL = os.environ.get('DF_EMBED_IMAGES_BY_URL', 'false').lower() in {'true', '1', 'yes'}
+
+BULK_OPERATION_CONCURRENCY = int(os.environ.get('DF_BULK_OPERATION_CONCURRENCY', '4'))  # Max API calls in flight per "all" button
+
 SERVER_NOTIFICATION_VALUE = 'official_Discord_server'
 DM_NOTIFICATION_VALUE = 'official_Discord_DM'
 
@@ -233,12 +241,74 @@ def create_paginated_select_options(
     return options_for_view
 
 
-async def get_image_as_discord_file(url: str) -> discord.File:
-    async with httpx.AsyncClient() as client:
+async def gather_bounded(*aws: Awaitable, limit: int, return_exceptions: bool = False) -> list:
+    """ Like `asyncio.gather()`, but with at most `limit` of the awaitables running at once. Results keep their order. """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(aw: Awaitable):
+        async with semaphore:
+            return await aw
+
+    return await asyncio.gather(*(run(aw) for aw in aws), return_exceptions=return_exceptions)
+
+
+async def run_bulk_operation(
+        items: list[dict],
+        operation: Callable[[dict], Awaitable[Any]],
+        limit: int = BULK_OPERATION_CONCURRENCY
+) -> tuple[list[tuple[dict, Any]], list[tuple[dict, RuntimeError | httpx.HTTPError]]]:
+    """ Run `operation` on each of `items`, `limit` at a time, and sort them into those which succeeded (with their
+    results) and those which failed, whether the API refused them or couldn't be reached (with the error), rather than
+    stopping at the first failure. """
+    results = await gather_bounded(*(operation(item) for item in items), limit=limit, return_exceptions=True)
+
+    succeeded, failed = [], []
+    for item, result in zip(items, results):
+        if isinstance(result, (RuntimeError, httpx.HTTPError)):
+            failed.append((item, result))
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            succeeded.append((item, result))
+    return succeeded, failed
+
+
+def bulk_failures_md(failed: list[tuple[dict, RuntimeError | httpx.HTTPError]]) -> str:
+    """ List the cargo stacks a bulk operation failed on, and why """
+    return '\n'.join(
+        f'- {cargo['name']} ({cargo['quantity']:,}): {error or type(error).__name__}'  # Timeouts have no message
+        for cargo, error in failed
+    )
+
+
+_image_cache: dict[str, bytes] = {}
+
+
+async def get_image_bytes(url: str) -> bytes:
+    """ Get the image at `url`, only downloading it the first time it's asked for """
+    if url not in _image_cache:
+        parsed_url = httpx.URL(url)
+        client = api_calls.http_client(f'{parsed_url.scheme}://{parsed_url.netloc.decode()}')
         response = await client.get(url)
         response.raise_for_status()  # Ensure we got a successful response
-        image_bytes = io.BytesIO(response.content)  # Wrap the content in a BytesIO object
-    return discord.File(fp=image_bytes, filename='image.png')
+        _image_cache[url] = response.content
+    return _image_cache[url]
+
+
+async def get_image_as_discord_file(url: str, filename: str = 'image.png') -> discord.File:
+    # Each send needs its own file object, but `BytesIO` shares the cached bytes rather than copying them
+    image_bytes = io.BytesIO(await get_image_bytes(url))
+    return discord.File(fp=image_bytes, filename=filename)
+
+
+async def set_embed_image(embed: discord.Embed, url: str) -> list[discord.File]:
+    """ Set `embed`'s image to the image at `url`, returning any files which need to be attached for it """
+    if EMBED_IMAGES_BY_URL:
+        embed.set_image(url=url)
+        return []
+
+    embed.set_image(url='attachment://image.png')
+    return [await get_image_as_discord_file(url)]
 
 
 def df_embed_author(embed: discord.Embed, df_state: DFState) -> discord.Embed:
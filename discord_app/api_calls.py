@@ -1,28 +1,168 @@
 # SPDX-FileCopyrightText: 2024-present Oori Data <info@oori.dev>
 # SPDX-License-Identifier: UNLICENSED
 import                        os
+import                        json
+import                        asyncio
+import                        importlib.util
+from collections       import OrderedDict
 from uuid              import UUID
 from datetime          import datetime, timezone, timedelta, UTC
+from typing            import Any, Awaitable, Callable
 
 import                        httpx
 from jose              import jwt
 
 from df_lib.map_struct import serialize_map, deserialize_map
 
+from discord_app       import leaderboards
+
 DF_API_HOST = os.environ['DF_API_HOST']
 DF_MAP_RENDERER = os.environ['DF_MAP_RENDERER']
 API_SUCCESS_CODE = 200
+API_NOT_FOUND_CODE = 404
+API_METHOD_NOT_ALLOWED_CODE = 405
 API_UNPROCESSABLE_ENTITY_CODE = 422
 API_INTERNAL_SERVER_ERROR = 500
 
 SKELETON_KEY = os.environ['DF_SKELETON_KEY']
 
+# Connection pool tuning for the long-lived per-host clients
+HTTP_MAX_CONNECTIONS = int(os.environ.get('DF_HTTP_MAX_CONNECTIONS', '50'))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get('DF_HTTP_MAX_KEEPALIVE_CONNECTIONS', '20'))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get('DF_HTTP_KEEPALIVE_EXPIRY', '30'))
+# Per-host overrides of the limits above, as JSON, e.g. `{"http://df_map:9100": {"max_connections": 8}}`
+HTTP_HOST_LIMITS: dict[str, dict] = json.loads(os.environ.get('DF_HTTP_HOST_LIMITS', '{}'))
+HTTP2_AVAILABLE = importlib.util.find_spec('h2') is not None  # httpx only speaks HTTP/2 with the `h2` extra installed
+
+_http_clients: dict[str, httpx.AsyncClient] = {}
+
+
+def http_client(host: str) -> httpx.AsyncClient:
+    """ Get the shared, pooled client for `host` (scheme, host and port), creating it on first use. """
+    client = _http_clients.get(host)
+    if client is None or client.is_closed:
+        host_limits = HTTP_HOST_LIMITS.get(host, {})
+        client = httpx.AsyncClient(
+            verify=host not in (DF_API_HOST, DF_MAP_RENDERER),  # Only our own hosts skip certificate checks
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=host_limits.get('max_connections', HTTP_MAX_CONNECTIONS),
+                max_keepalive_connections=host_limits.get('max_keepalive_connections', HTTP_MAX_KEEPALIVE_CONNECTIONS),
+                keepalive_expiry=host_limits.get('keepalive_expiry', HTTP_KEEPALIVE_EXPIRY)
+            )
+        )
+        _http_clients[host] = client
+    return client
+
+
+def open_http_clients():
+    """ Warm up the pooled clients for every host the bot talks to. """
+    for host in (DF_API_HOST, DF_MAP_RENDERER):
+        http_client(host)
+
+
+async def close_http_clients():
+    """ Close every pooled client, draining their keep-alive connections. """
+    clients = list(_http_clients.values())
+    _http_clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
+# Vendors are cached whole; inventories go stale quickly, but a vendor's identity (name, settlement, position) never changes
+VENDOR_INVENTORY_TTL = timedelta(seconds=int(os.environ.get('DF_VENDOR_INVENTORY_TTL_SECONDS', '30')))
+VENDOR_IDENTITY_TTL = timedelta(seconds=int(os.environ.get('DF_VENDOR_IDENTITY_TTL_SECONDS', '21600')))  # 6 hours
+
+_vendor_cache: dict[str, tuple[bytes, datetime]] = {}  # vendor_id -> (raw vendor JSON, fetched at); bounded by the map
+_vendor_generations: dict[str, int] = {}  # vendor_id -> number of invalidations, to spot fetches which raced a mutation
+
+# Convoys are cached as of the last API response which included them (most mutations answer with the updated convoy).
+# A convoy on a journey moves without any mutation, so entries also go stale with time.
+CONVOY_CACHE_TTL = timedelta(seconds=int(os.environ.get('DF_CONVOY_CACHE_TTL_SECONDS', '60')))
+CONVOY_CACHE_MAX_SIZE = int(os.environ.get('DF_CONVOY_CACHE_MAX_SIZE', '1024'))  # Max cached convoys (and tombstones)
+
+# LRU of convoy_id -> (raw convoy JSON, or `None` once invalidated; when the request which produced it was sent)
+_convoy_cache: OrderedDict[str, tuple[bytes | None, datetime]] = OrderedDict()
+
+# Banner leaderboards only move with in-game activity, so a few minutes' lag is fine
+LEADERBOARD_CACHE_TTL = timedelta(seconds=int(os.environ.get('DF_LEADERBOARD_CACHE_TTL_SECONDS', '300')))  # 5 minutes
+
+# (kind, banner_id) -> (leaderboard, ranked when fetched; fetched at)
+_leaderboard_cache: dict[tuple[str, str], tuple[leaderboards.RankedLeaderboard, datetime]] = {}
+
+# Batch part compatibility route, expected to answer with `{vehicle_id: {part_cargo_id: compatibilities | {'detail': msg}}}`
+# Leave unset while the API doesn't have one; compatibility is then checked with a bounded fan-out of the per-pair route
+PART_COMPATIBILITY_BATCH_ROUTE = os.environ.get('DF_PART_COMPATIBILITY_BATCH_ROUTE')
+PART_COMPATIBILITY_CONCURRENCY = int(os.environ.get('DF_PART_COMPATIBILITY_CONCURRENCY', '8'))
+
+# Bulk dialogue routes, expected to take `{'user_ids': [...]}` and answer with `{user_id: result | {'detail': msg}}`
+# Without them (see `_post_to_batch_route`), the per-user routes are fanned out instead
+UNSEEN_DIALOGUE_BATCH_ROUTE = os.environ.get('DF_UNSEEN_DIALOGUE_BATCH_ROUTE')
+MARK_DIALOGUE_SEEN_BATCH_ROUTE = os.environ.get('DF_MARK_DIALOGUE_SEEN_BATCH_ROUTE')
+DIALOGUE_BATCH_SIZE = int(os.environ.get('DF_DIALOGUE_BATCH_SIZE', '100'))  # User IDs per bulk request
+DIALOGUE_CONCURRENCY = int(os.environ.get('DF_DIALOGUE_CONCURRENCY', '16'))  # Requests in flight at once, bulk or per-user
+
+# Query parameter the Discord users route takes to only answer with users updated since then (an ISO timestamp)
+# Leave unset while the API doesn't have one; every sync then fetches every user, and changes are found by diffing
+DISCORD_USERS_UPDATED_SINCE_PARAM = os.environ.get('DF_DISCORD_USERS_UPDATED_SINCE_PARAM')
+
+# Read-only endpoints whose responses don't depend on who's asking, so identical concurrent GETs can share one request.
+# Callers fetch these with the app session (or none), never a user's. Never add mutating endpoints here.
+COALESCED_ENDPOINTS = frozenset(os.environ.get(
+    'DF_COALESCED_ENDPOINTS',
+    '/map/tile/get,/vendor/get,/vehicle/get,/cargo/resource/weights,/banner/settlement/get,'
+    '/banner/leaderboard/civic/all,/banner/leaderboard/syndicate/all'
+).split(','))
+
+_in_flight: dict[tuple, asyncio.Task] = {}
+
+
+async def coalesced_get(url: str, params: dict | None = None, **kwargs) -> httpx.Response:
+    """ GET `url` on the DF API, sharing a single in-flight request between identical concurrent calls. """
+    client = http_client(DF_API_HOST)
+    if url.removeprefix(DF_API_HOST) not in COALESCED_ENDPOINTS:
+        return await client.get(url=url, params=params, **kwargs)
+
+    key = (url, tuple(sorted((k, str(v)) for k, v in (params or {}).items())))
+    task = _in_flight.get(key)
+    if task is None:
+        task = asyncio.create_task(client.get(url=url, params=params, **kwargs))
+        _in_flight[key] = task
+        task.add_done_callback(lambda done: _in_flight.pop(key) if _in_flight.get(key) is done else None)
+
+    # Shield so one caller giving up doesn't cancel the request for everyone else waiting on it
+    # Callers each parse the shared response themselves, so nobody ends up mutating someone else's dict
+    return await asyncio.shield(task)
+
+
+SESSION_LIFETIME = timedelta(minutes=10)
+SESSION_REFRESH_MARGIN = timedelta(seconds=int(os.environ.get('DF_SESSION_REFRESH_MARGIN', '60')))  # Re-sign this long before `exp`
+SESSION_CACHE_MAX_SIZE = int(os.environ.get('DF_SESSION_CACHE_MAX_SIZE', '1024'))  # Max cached per-user subjects
+APP_SESSION_SUBJECT = 'DF_DISCORD_APP'
+
+_app_session: tuple[str, datetime] | None = None  # The app subject is never evicted
+_user_sessions: OrderedDict[str, tuple[str, datetime]] = OrderedDict()  # LRU of per-user subjects
+session_cache_stats = {'hits': 0, 'misses': 0}
+
 
 def create_session(user_id) -> str:
-    exp = datetime.now(UTC) + timedelta(minutes=10)
-    return jwt.encode(
+    """ Get a session token for `user_id`, reusing a cached one until shortly before it expires. """
+    global _app_session
+    subject = str(user_id)
+    now = datetime.now(UTC)
+
+    cached = _app_session if subject == APP_SESSION_SUBJECT else _user_sessions.get(subject)
+    if cached and cached[1] - SESSION_REFRESH_MARGIN > now:
+        session_cache_stats['hits'] += 1
+        if subject != APP_SESSION_SUBJECT:
+            _user_sessions.move_to_end(subject)
+        return cached[0]
+
+    session_cache_stats['misses'] += 1
+    exp = now + SESSION_LIFETIME
+    token = jwt.encode(
         claims={
-            'sub': str(user_id),
+            'sub': subject,
             'exp': exp,
             'provider': 'oori'
         },
@@ -30,6 +170,24 @@ def create_session(user_id) -> str:
         algorithm='HS256',
     )
 
+    if subject == APP_SESSION_SUBJECT:
+        _app_session = (token, exp)
+    else:
+        _user_sessions[subject] = (token, exp)
+        _user_sessions.move_to_end(subject)
+        while len(_user_sessions) > SESSION_CACHE_MAX_SIZE:
+            _user_sessions.popitem(last=False)  # Evict the least recently used subject
+
+    return token
+
+
+class PartIncompatibleError(RuntimeError):
+    """ The API's answer that a part can't go on a vehicle, as opposed to a failure to get any answer """
+
+
+class ConvoyNotFoundError(RuntimeError):
+    """ The API's answer that a convoy doesn't exist (anymore), e.g. because storing its last vehicle disbanded it """
+
 
 def _check_code(response: httpx.Response):
     if response.status_code == API_INTERNAL_SERVER_ERROR:
@@ -40,6 +198,33 @@ def _check_code(response: httpx.Response):
         raise RuntimeError(msg)
 
 
+async def _post_to_batch_route(
+        batch_route: str | None,
+        body: dict,
+        session_subject,
+        semaphore: asyncio.Semaphore
+) -> Any | None:
+    """ POST `body` to the optional `batch_route`, as `session_subject`, and return what it answers with. Returns `None`
+    if there's no batch route to use, whether it's unset or this API doesn't have it, so the caller can fall back to
+    the per-item route. """
+    if not batch_route:
+        return None
+
+    headers = {'Authorization': f'Bearer {create_session(session_subject)}'}
+    client = http_client(DF_API_HOST)
+    async with semaphore:
+        response = await client.post(
+            url=f'{DF_API_HOST}{batch_route}',
+            json=body,
+            headers=headers
+        )
+
+    if response.status_code in {API_NOT_FOUND_CODE, API_METHOD_NOT_ALLOWED_CODE}:
+        return None
+    _check_code(response)
+    return response.json()
+
+
 async def render_map(
         tiles: list[list[dict]],
         highlights: list[list] | None = None,
@@ -47,20 +232,20 @@ async def render_map(
         highlight_color = None,
         lowlight_color = None
 ):
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.post(
-            url=f'{DF_MAP_RENDERER}/render-map',
-            headers={'Content-Type': 'application/octet-stream'},
-            data=serialize_map({
-                'tiles': tiles,
-                'highlights': highlights,
-                'lowlights': lowlights
-            }),
-            params={
-                'highlight_color': highlight_color,
-                'lowlight_color': lowlight_color
-            }
-        )
+    client = http_client(DF_MAP_RENDERER)
+    response = await client.post(
+        url=f'{DF_MAP_RENDERER}/render-map',
+        headers={'Content-Type': 'application/octet-stream'},
+        data=serialize_map({
+            'tiles': tiles,
+            'highlights': highlights,
+            'lowlights': lowlights
+        }),
+        params={
+            'highlight_color': highlight_color,
+            'lowlight_color': lowlight_color
+        }
+    )
 
     # Check response status
     _check_code(response)
@@ -88,13 +273,13 @@ async def get_map(
         params['y_max'] = y_max
 
     headers = {'Authorization': f'Bearer {create_session('DF_DISCORD_APP')}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.get(
-            url=f'{DF_API_HOST}/map/get',
-            params=params,
-            headers=headers,
-            timeout=30
-        )
+    client = http_client(DF_API_HOST)
+    response = await client.get(
+        url=f'{DF_API_HOST}/map/get',
+        params=params,
+        headers=headers,
+        timeout=30
+    )
 
     _check_code(response)
     return deserialize_map(response.content)
@@ -102,39 +287,37 @@ async def get_map(
 
 async def get_tile(x: int, y: int, user_id: UUID | None = None) -> dict:
     headers = {'Authorization': f'Bearer {create_session('DF_DISCORD_APP')}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.get(
-            url=f'{DF_API_HOST}/map/tile/get',
-            params={
-                'x': x,
-                'y': y
-            },
-            headers=headers
-        )
+    response = await coalesced_get(
+        url=f'{DF_API_HOST}/map/tile/get',
+        params={
+            'x': x,
+            'y': y
+        },
+        headers=headers
+    )
 
     _check_code(response)
     return response.json()
 
 async def resource_weights() -> dict:
     """ Fetch the weight per unit of each resource type from the API. """
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.get(
-            url=f'{DF_API_HOST}/cargo/resource/weights'
-        )
+    response = await coalesced_get(
+        url=f'{DF_API_HOST}/cargo/resource/weights'
+    )
 
     _check_code(response)
     return response.json()
 
 
 async def new_user(username: str, discord_id: int) -> dict:
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.post(
-            url=f'{DF_API_HOST}/user/new',
-            params={
-                'username': username,
-                'discord_id': discord_id
-            }
-        )
+    client = http_client(DF_API_HOST)
+    response = await client.post(
+        url=f'{DF_API_HOST}/user/new',
+        params={
+            'username': username,
+            'discord_id': discord_id
+        }
+    )
 
     _check_code(response)
     return response.json()
@@ -142,12 +325,12 @@ async def new_user(username: str, discord_id: int) -> dict:
 
 async def get_user(user_id: UUID) -> dict:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.get(
-            url=f'{DF_API_HOST}/user/get',
-            params={},
-            headers=headers,
-        )
+    client = http_client(DF_API_HOST)
+    response = await client.get(
+        url=f'{DF_API_HOST}/user/get',
+        params={},
+        headers=headers,
+    )
 
     _check_code(response)
     return response.json()
@@ -155,26 +338,32 @@ async def get_user(user_id: UUID) -> dict:
 
 async def get_user_by_discord(discord_id: int) -> dict:
     headers = {'Authorization': f'Bearer {create_session('DF_DISCORD_APP')}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.get(
-            url=f'{DF_API_HOST}/user/get_by_discord_id',
-            params={
-                'discord_id': discord_id
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    response = await client.get(
+        url=f'{DF_API_HOST}/user/get_by_discord_id',
+        params={
+            'discord_id': discord_id
+        },
+        headers=headers
+    )
 
     _check_code(response)
     return response.json()
 
 
-async def get_discord_users() -> list[dict]:
+async def get_discord_users(updated_since: datetime | None = None) -> dict:
+    """ DF users with notifications on, by notification type. With `updated_since`, only users updated since then,
+    if the API supports it (see `DISCORD_USERS_UPDATED_SINCE_PARAM`); otherwise all of them. """
     headers = {'Authorization': f'Bearer {create_session('DF_DISCORD_APP')}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.get(
-            url=f'{DF_API_HOST}/user/discord_users',
-            headers=headers
-        )
+    params = {}
+    if updated_since and DISCORD_USERS_UPDATED_SINCE_PARAM:
+        params[DISCORD_USERS_UPDATED_SINCE_PARAM] = updated_since.isoformat()
+    client = http_client(DF_API_HOST)
+    response = await client.get(
+        url=f'{DF_API_HOST}/user/discord_users',
+        params=params,
+        headers=headers
+    )
 
     _check_code(response)
     return response.json()
@@ -182,13 +371,13 @@ async def get_discord_users() -> list[dict]:
 
 async def update_user_metadata(user_id: UUID, new_metadata: dict) -> dict:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.patch(
-            url=f'{DF_API_HOST}/user/update_metadata',
-            params={},
-            headers=headers,
-            json=new_metadata
-        )
+    client = http_client(DF_API_HOST)
+    response = await client.patch(
+        url=f'{DF_API_HOST}/user/update_metadata',
+        params={},
+        headers=headers,
+        json=new_metadata
+    )
 
     _check_code(response)
     return response.json()
@@ -196,14 +385,14 @@ async def update_user_metadata(user_id: UUID, new_metadata: dict) -> dict:
 
 async def new_convoy(user_id: UUID, new_convoy_name: str) -> dict:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.post(
-            url=f'{DF_API_HOST}/convoy/new',
-            params={
-                'convoy_name': new_convoy_name
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    response = await client.post(
+        url=f'{DF_API_HOST}/convoy/new',
+        params={
+            'convoy_name': new_convoy_name
+        },
+        headers=headers
+    )
 
     _check_code(response)
     return response.json()
@@ -211,62 +400,100 @@ async def new_convoy(user_id: UUID, new_convoy_name: str) -> dict:
 
 async def redeem_referral(user_id: UUID, referral_code: str) -> dict:  # XXX i think this is depricated
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.post(
-            url=f'{DF_API_HOST}/user/redeem_referral',
-            params={
-                'referral_code': referral_code
-            },
-            headers=headers
-        )
-        return response.json()
+    client = http_client(DF_API_HOST)
+    response = await client.post(
+        url=f'{DF_API_HOST}/user/redeem_referral',
+        params={
+            'referral_code': referral_code
+        },
+        headers=headers
+    )
+    return response.json()
 
 
-async def get_convoy(convoy_id: UUID, user_id: UUID) -> dict:
+async def get_convoy(convoy_id: UUID, user_id: UUID, max_age: timedelta = CONVOY_CACHE_TTL) -> dict:
+    """ Get a convoy, from cache if it was last seen less than `max_age` ago. """
+    cached = _convoy_cache.get(str(convoy_id))
+    if cached and cached[0] is not None and datetime.now(UTC) - cached[1] < max_age:
+        _convoy_cache.move_to_end(str(convoy_id))
+        return json.loads(cached[0])  # Parse a new copy each time, so callers can't step on each other's convoy dicts
+
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.get(
-            url=f'{DF_API_HOST}/convoy/get',
-            params={
-                'convoy_id': convoy_id
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    requested_at = datetime.now(UTC)
+    response = await client.get(
+        url=f'{DF_API_HOST}/convoy/get',
+        params={
+            'convoy_id': convoy_id
+        },
+        headers=headers
+    )
 
+    if response.status_code == API_NOT_FOUND_CODE:
+        raise ConvoyNotFoundError(response.json()['detail'])
     _check_code(response)
-    return response.json()
+    return _cache_convoy_response(response, requested_at)
+
+
+def cache_convoy(convoy: dict, requested_at: datetime, raw: bytes | None = None):
+    """ Write a convoy through to the cache, unless it was requested before the cached entry was (or before the convoy
+    was last invalidated); responses can come back out of order, and the older one mustn't win. """
+    convoy_key = str(convoy['convoy_id'])
+    cached = _convoy_cache.get(convoy_key)
+    if cached is None or cached[1] <= requested_at:
+        _store_convoy(convoy_key, raw if raw is not None else json.dumps(convoy).encode(), requested_at)
+
+
+def invalidate_convoy(convoy_id: UUID):
+    """ Mark a convoy as stale after a mutation which doesn't answer with the updated convoy """
+    _store_convoy(str(convoy_id), None, datetime.now(UTC))
+
+
+def _store_convoy(convoy_key: str, raw: bytes | None, requested_at: datetime):
+    _convoy_cache[convoy_key] = (raw, requested_at)
+    _convoy_cache.move_to_end(convoy_key)
+    while len(_convoy_cache) > CONVOY_CACHE_MAX_SIZE:
+        _convoy_cache.popitem(last=False)  # Evict the least recently used convoy
+
+
+def _cache_convoy_response(response: httpx.Response, requested_at: datetime) -> dict:
+    convoy = response.json()
+    if isinstance(convoy, dict) and 'convoy_id' in convoy:
+        cache_convoy(convoy, requested_at, raw=response.content)
+    return convoy
 
 
 async def move_cargo(convoy_id: UUID, cargo_id: UUID, dest_vehicle_id: UUID, user_id: UUID) -> dict:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.patch(
-            url=f'{DF_API_HOST}/convoy/cargo/move',
-            params={
-                'convoy_id': convoy_id,
-                'cargo_id': cargo_id,
-                'dest_vehicle_id': dest_vehicle_id,
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    requested_at = datetime.now(UTC)
+    response = await client.patch(
+        url=f'{DF_API_HOST}/convoy/cargo/move',
+        params={
+            'convoy_id': convoy_id,
+            'cargo_id': cargo_id,
+            'dest_vehicle_id': dest_vehicle_id,
+        },
+        headers=headers
+    )
 
     _check_code(response)
-    return response.json()
+    return _cache_convoy_response(response, requested_at)
 
 
 async def find_route(convoy_id: UUID, dest_x: int, dest_y: int, user_id: UUID) -> list[dict]:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.post(
-            url=f'{DF_API_HOST}/convoy/journey/find_route',
-            params={
-                'convoy_id': convoy_id,
-                'dest_x': dest_x,
-                'dest_y': dest_y
-            },
-            headers=headers,
-            timeout=20
-        )
+    client = http_client(DF_API_HOST)
+    response = await client.post(
+        url=f'{DF_API_HOST}/convoy/journey/find_route',
+        params={
+            'convoy_id': convoy_id,
+            'dest_x': dest_x,
+            'dest_y': dest_y
+        },
+        headers=headers,
+        timeout=20
+    )
 
     _check_code(response)
     return response.json()
@@ -274,216 +501,254 @@ async def find_route(convoy_id: UUID, dest_x: int, dest_y: int, user_id: UUID) -
 
 async def send_convoy(convoy_id: UUID, journey_id: UUID, user_id: UUID) -> dict:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.patch(
-            url=f'{DF_API_HOST}/convoy/journey/send',
-            params={
-                'convoy_id': convoy_id,
-                'journey_id': journey_id
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    requested_at = datetime.now(UTC)
+    response = await client.patch(
+        url=f'{DF_API_HOST}/convoy/journey/send',
+        params={
+            'convoy_id': convoy_id,
+            'journey_id': journey_id
+        },
+        headers=headers
+    )
 
     _check_code(response)
-    return response.json()
+    return _cache_convoy_response(response, requested_at)
 
 
 async def cancel_journey(convoy_id: UUID, journey_id: UUID, user_id: UUID) -> dict:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.patch(
-            url=f'{DF_API_HOST}/convoy/journey/cancel',
-            params={
-                'convoy_id': convoy_id,
-                'journey_id': journey_id
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    requested_at = datetime.now(UTC)
+    response = await client.patch(
+        url=f'{DF_API_HOST}/convoy/journey/cancel',
+        params={
+            'convoy_id': convoy_id,
+            'journey_id': journey_id
+        },
+        headers=headers
+    )
 
     _check_code(response)
-    return response.json()
+    return _cache_convoy_response(response, requested_at)
 
 
-async def get_vendor(vendor_id: UUID, user_id: UUID) -> dict:
-    headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.get(
-            url=f'{DF_API_HOST}/vendor/get',
-            params={
-                'vendor_id': vendor_id
-            },
-            headers=headers
-        )
+async def get_vendor(vendor_id: UUID, user_id: UUID | None = None, identity_only: bool = False) -> dict:
+    """ Get a vendor, from cache if it's fresh enough. Callers which only need a vendor's identity (name, `sett_id`,
+    x/y) should pass `identity_only`, which accepts much older cached data than the inventories can tolerate.
+    A vendor is the same whoever asks (the map serves vendors to the app session too), so it's fetched with the app
+    session, and the cached and in-flight responses are shared between users. """
+    vendor_key = str(vendor_id)
+    cached = _vendor_cache.get(vendor_key)
+    ttl = VENDOR_IDENTITY_TTL if identity_only else VENDOR_INVENTORY_TTL
+    if cached and datetime.now(UTC) - cached[1] < ttl:
+        return json.loads(cached[0])  # Parse a new copy each time, so callers can't step on each other's vendor dicts
+
+    generation = _vendor_generations.get(vendor_key, 0)
+    headers = {'Authorization': f'Bearer {create_session('DF_DISCORD_APP')}'}
+    response = await coalesced_get(
+        url=f'{DF_API_HOST}/vendor/get',
+        params={
+            'vendor_id': vendor_id
+        },
+        headers=headers
+    )
 
     _check_code(response)
+    if _vendor_generations.get(vendor_key, 0) == generation:  # Don't cache a response which raced a mutation
+        _vendor_cache[vendor_key] = (response.content, datetime.now(UTC))
     return response.json()
 
 
+def invalidate_vendor(vendor_id: UUID):
+    """ Drop a vendor from the cache, since it's just been traded with """
+    vendor_key = str(vendor_id)
+    _vendor_cache.pop(vendor_key, None)
+    _vendor_generations[vendor_key] = _vendor_generations.get(vendor_key, 0) + 1
+
+
 async def buy_vehicle(vendor_id: UUID, convoy_id: UUID, vehicle_id: UUID, user_id: UUID) -> dict:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.patch(
-            url=f'{DF_API_HOST}/vendor/vehicle/buy',
-            params={
-                'vendor_id': vendor_id,
-                'convoy_id': convoy_id,
-                'vehicle_id': vehicle_id
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    requested_at = datetime.now(UTC)
+    response = await client.patch(
+        url=f'{DF_API_HOST}/vendor/vehicle/buy',
+        params={
+            'vendor_id': vendor_id,
+            'convoy_id': convoy_id,
+            'vehicle_id': vehicle_id
+        },
+        headers=headers
+    )
 
+    invalidate_vendor(vendor_id)
     _check_code(response)
-    return response.json()
+    return _cache_convoy_response(response, requested_at)
 
 
 async def sell_vehicle(vendor_id: UUID, convoy_id: UUID, vehicle_id: UUID, user_id: UUID) -> dict:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.patch(
-            url=f'{DF_API_HOST}/vendor/vehicle/sell',
-            params={
-                'vendor_id': vendor_id,
-                'convoy_id': convoy_id,
-                'vehicle_id': vehicle_id
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    requested_at = datetime.now(UTC)
+    response = await client.patch(
+        url=f'{DF_API_HOST}/vendor/vehicle/sell',
+        params={
+            'vendor_id': vendor_id,
+            'convoy_id': convoy_id,
+            'vehicle_id': vehicle_id
+        },
+        headers=headers
+    )
 
+    invalidate_vendor(vendor_id)
     _check_code(response)
-    return response.json()
+    return _cache_convoy_response(response, requested_at)
 
 
 async def buy_cargo(vendor_id: UUID, convoy_id: UUID, cargo_id: UUID, quantity: int, user_id: UUID) -> dict:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.patch(
-            url=f'{DF_API_HOST}/vendor/cargo/buy',
-            params={
-                'vendor_id': vendor_id,
-                'convoy_id': convoy_id,
-                'cargo_id': cargo_id,
-                'quantity': quantity
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    requested_at = datetime.now(UTC)
+    response = await client.patch(
+        url=f'{DF_API_HOST}/vendor/cargo/buy',
+        params={
+            'vendor_id': vendor_id,
+            'convoy_id': convoy_id,
+            'cargo_id': cargo_id,
+            'quantity': quantity
+        },
+        headers=headers
+    )
 
+    invalidate_vendor(vendor_id)
     _check_code(response)
-    return response.json()
+    return _cache_convoy_response(response, requested_at)
 
 
 async def sell_cargo(vendor_id: UUID, convoy_id: UUID, cargo_id: UUID, quantity: int, user_id: UUID) -> dict:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.patch(
-            url=f'{DF_API_HOST}/vendor/cargo/sell',
-            params={
-                'vendor_id': vendor_id,
-                'convoy_id': convoy_id,
-                'cargo_id': cargo_id,
-                'quantity': quantity
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    requested_at = datetime.now(UTC)
+    response = await client.patch(
+        url=f'{DF_API_HOST}/vendor/cargo/sell',
+        params={
+            'vendor_id': vendor_id,
+            'convoy_id': convoy_id,
+            'cargo_id': cargo_id,
+            'quantity': quantity
+        },
+        headers=headers
+    )
 
+    invalidate_vendor(vendor_id)
     _check_code(response)
-    return response.json()
+    return _cache_convoy_response(response, requested_at)
 
 
 async def buy_resource(vendor_id: UUID, convoy_id: UUID, resource_type: str, quantity: int, user_id: UUID) -> dict:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.patch(
-            url=f'{DF_API_HOST}/vendor/resource/buy',
-            params={
-                'vendor_id': vendor_id,
-                'convoy_id': convoy_id,
-                'resource_type': resource_type,
-                'quantity': round(quantity, 3)  # Rounding to catch floating point errors
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    requested_at = datetime.now(UTC)
+    response = await client.patch(
+        url=f'{DF_API_HOST}/vendor/resource/buy',
+        params={
+            'vendor_id': vendor_id,
+            'convoy_id': convoy_id,
+            'resource_type': resource_type,
+            'quantity': round(quantity, 3)  # Rounding to catch floating point errors
+        },
+        headers=headers
+    )
 
+    invalidate_vendor(vendor_id)
     _check_code(response)
-    return response.json()
+    return _cache_convoy_response(response, requested_at)
 
 
 async def sell_resource(vendor_id: UUID, convoy_id: UUID, resource_type: str, quantity: int, user_id: UUID) -> dict:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.patch(
-            url=f'{DF_API_HOST}/vendor/resource/sell',
-            params={
-                'vendor_id': vendor_id,
-                'convoy_id': convoy_id,
-                'resource_type': resource_type,
-                'quantity': round(quantity, 3)  # Rounding to catch floating point errors
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    requested_at = datetime.now(UTC)
+    response = await client.patch(
+        url=f'{DF_API_HOST}/vendor/resource/sell',
+        params={
+            'vendor_id': vendor_id,
+            'convoy_id': convoy_id,
+            'resource_type': resource_type,
+            'quantity': round(quantity, 3)  # Rounding to catch floating point errors
+        },
+        headers=headers
+    )
 
+    invalidate_vendor(vendor_id)
     _check_code(response)
-    return response.json()
+    return _cache_convoy_response(response, requested_at)
 
 
 async def add_part(vendor_id: UUID, convoy_id: UUID, vehicle_id: UUID, part_cargo_id: UUID, user_id: UUID) -> dict:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.patch(
-            url=f'{DF_API_HOST}/vendor/vehicle/part/add',
-            params={
-                'vendor_id': vendor_id,
-                'convoy_id': convoy_id,
-                'vehicle_id': vehicle_id,
-                'part_cargo_id': part_cargo_id
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    requested_at = datetime.now(UTC)
+    response = await client.patch(
+        url=f'{DF_API_HOST}/vendor/vehicle/part/add',
+        params={
+            'vendor_id': vendor_id,
+            'convoy_id': convoy_id,
+            'vehicle_id': vehicle_id,
+            'part_cargo_id': part_cargo_id
+        },
+        headers=headers
+    )
 
+    invalidate_vendor(vendor_id)
     _check_code(response)
-    return response.json()
+    return _cache_convoy_response(response, requested_at)
 
 
 async def remove_part(vendor_id: UUID, convoy_id: UUID, vehicle_id: UUID, part_id: UUID, user_id: UUID) -> dict:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.patch(
-            url=f'{DF_API_HOST}/vendor/vehicle/part/remove',
-            params={
-                'vendor_id': vendor_id,
-                'convoy_id': convoy_id,
-                'vehicle_id': vehicle_id,
-                'part_id': part_id
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    requested_at = datetime.now(UTC)
+    response = await client.patch(
+        url=f'{DF_API_HOST}/vendor/vehicle/part/remove',
+        params={
+            'vendor_id': vendor_id,
+            'convoy_id': convoy_id,
+            'vehicle_id': vehicle_id,
+            'part_id': part_id
+        },
+        headers=headers
+    )
 
+    invalidate_vendor(vendor_id)
     _check_code(response)
-    return response.json()
+    return _cache_convoy_response(response, requested_at)
 
 
 async def vendor_scrap_vehicle(vendor_id: UUID, convoy_id: UUID, vehicle_id: UUID, user_id: UUID) -> dict:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.patch(
-            url=f'{DF_API_HOST}/vendor/vehicle/scrap',
-            params={
-                'vendor_id': vendor_id,
-                'convoy_id': convoy_id,
-                'vehicle_id': vehicle_id
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    requested_at = datetime.now(UTC)
+    response = await client.patch(
+        url=f'{DF_API_HOST}/vendor/vehicle/scrap',
+        params={
+            'vendor_id': vendor_id,
+            'convoy_id': convoy_id,
+            'vehicle_id': vehicle_id
+        },
+        headers=headers
+    )
 
+    invalidate_vendor(vendor_id)
     _check_code(response)
-    return response.json()
+    return _cache_convoy_response(response, requested_at)
 
 
 async def get_vehicle(vehicle_id: UUID) -> dict:
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.get(
-            url=f'{DF_API_HOST}/vehicle/get',
-            params={'vehicle_id': vehicle_id}
-        )
+    response = await coalesced_get(
+        url=f'{DF_API_HOST}/vehicle/get',
+        params={'vehicle_id': vehicle_id}
+    )
 
     _check_code(response)
     return response.json()
@@ -491,30 +756,79 @@ async def get_vehicle(vehicle_id: UUID) -> dict:
 
 async def check_part_compatibility(vehicle_id: UUID, part_cargo_id: UUID, user_id: UUID) -> dict:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.get(
-            url=f'{DF_API_HOST}/vehicle/part/check_compatibility',
-            params={
-                'vehicle_id': vehicle_id,
-                'part_cargo_id': part_cargo_id
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    response = await client.get(
+        url=f'{DF_API_HOST}/vehicle/part/check_compatibility',
+        params={
+            'vehicle_id': vehicle_id,
+            'part_cargo_id': part_cargo_id
+        },
+        headers=headers
+    )
 
+    if response.status_code == API_UNPROCESSABLE_ENTITY_CODE:
+        raise PartIncompatibleError(response.json()['detail'])
     _check_code(response)
     return response.json()
 
 
+async def check_parts_compatibility(
+        vehicle_ids: list[UUID],
+        part_cargo_ids: list[UUID],
+        user_id: UUID,
+        semaphore: asyncio.Semaphore | None = None
+) -> dict[str, dict[str, list[dict] | RuntimeError]]:
+    """ Check every part cargo against every vehicle, as `{vehicle_id: {part_cargo_id: compatibilities}}`.
+    Incompatible pairs get a `PartIncompatibleError` in place of their compatibilities, and pairs which couldn't be
+    checked (e.g. the API erroring) get the `RuntimeError`.
+    Pass `semaphore` to share a concurrency limit with other requests; otherwise, it's `PART_COMPATIBILITY_CONCURRENCY`. """
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(PART_COMPATIBILITY_CONCURRENCY)
+
+    batch_results = await _post_to_batch_route(
+        PART_COMPATIBILITY_BATCH_ROUTE,
+        {
+            'vehicle_ids': [str(vehicle_id) for vehicle_id in vehicle_ids],
+            'part_cargo_ids': [str(part_cargo_id) for part_cargo_id in part_cargo_ids]
+        },
+        user_id,
+        semaphore
+    )
+    if batch_results is not None:
+        return {
+            vehicle_id: {
+                part_cargo_id: PartIncompatibleError(result['detail']) if isinstance(result, dict) else result
+                for part_cargo_id, result in vehicle_results.items()
+            }
+            for vehicle_id, vehicle_results in batch_results.items()
+        }
+
+    async def check(vehicle_id: UUID, part_cargo_id: UUID) -> list[dict] | RuntimeError:
+        async with semaphore:
+            try:
+                return await check_part_compatibility(vehicle_id, part_cargo_id, user_id)
+            except RuntimeError as e:
+                return e
+
+    pairs = [(vehicle_id, part_cargo_id) for vehicle_id in vehicle_ids for part_cargo_id in part_cargo_ids]
+    results = await asyncio.gather(*(check(vehicle_id, part_cargo_id) for vehicle_id, part_cargo_id in pairs))
+
+    matrix = {str(vehicle_id): {} for vehicle_id in vehicle_ids}
+    for (vehicle_id, part_cargo_id), result in zip(pairs, results):
+        matrix[str(vehicle_id)][str(part_cargo_id)] = result
+    return matrix
+
+
 async def check_scrap(vehicle_id: UUID, user_id: UUID) -> dict:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.get(
-            url=f'{DF_API_HOST}/vehicle/check_scrap',
-            params={
-                'vehicle_id': vehicle_id
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    response = await client.get(
+        url=f'{DF_API_HOST}/vehicle/check_scrap',
+        params={
+            'vehicle_id': vehicle_id
+        },
+        headers=headers
+    )
 
     _check_code(response)
     return response.json()
@@ -522,16 +836,16 @@ async def check_scrap(vehicle_id: UUID, user_id: UUID) -> dict:
 
 async def send_message(sender_id: UUID, recipient_id: UUID, message: str, user_id: UUID) -> dict:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.post(
-            url=f'{DF_API_HOST}/dialogue/send',
-            params={  # Use JSON body for POST requests
-                'sender_id': sender_id,
-                'recipient_id': recipient_id,
-                'message': message
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    response = await client.post(
+        url=f'{DF_API_HOST}/dialogue/send',
+        params={  # Use JSON body for POST requests
+            'sender_id': sender_id,
+            'recipient_id': recipient_id,
+            'message': message
+        },
+        headers=headers
+    )
 
     _check_code(response)
     return response.json()
@@ -539,15 +853,15 @@ async def send_message(sender_id: UUID, recipient_id: UUID, message: str, user_i
 
 async def get_dialogue_by_char_ids(char_a_id: UUID, char_b_id: UUID, user_id: UUID) -> list[dict]:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.get(
-            url=f'{DF_API_HOST}/dialogue/get_by_char_ids',
-            params={
-                'char_a_id': char_a_id,
-                'char_b_id': char_b_id,
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    response = await client.get(
+        url=f'{DF_API_HOST}/dialogue/get_by_char_ids',
+        params={
+            'char_a_id': char_a_id,
+            'char_b_id': char_b_id,
+        },
+        headers=headers
+    )
 
     _check_code(response)
     return response.json()
@@ -555,12 +869,12 @@ async def get_dialogue_by_char_ids(char_a_id: UUID, char_b_id: UUID, user_id: UU
 
 async def get_unseen_dialogue_for_user(user_id: UUID) -> list[dict]:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.get(
-            url=f'{DF_API_HOST}/dialogue/get_user_unseen_messages',
-            params={},
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    response = await client.get(
+        url=f'{DF_API_HOST}/dialogue/get_user_unseen_messages',
+        params={},
+        headers=headers
+    )
 
     _check_code(response)
     return response.json()
@@ -568,27 +882,76 @@ async def get_unseen_dialogue_for_user(user_id: UUID) -> list[dict]:
 
 async def mark_dialogue_as_seen(user_id: UUID) -> list[dict]:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.patch(
-            url=f'{DF_API_HOST}/dialogue/mark_user_dialogues_as_seen',
-            params={},
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    response = await client.patch(
+        url=f'{DF_API_HOST}/dialogue/mark_user_dialogues_as_seen',
+        params={},
+        headers=headers
+    )
 
     _check_code(response)
     return response.json()
 
 
+async def _for_users_in_batches(
+        user_ids: list[UUID],
+        batch_route: str | None,
+        per_user_call: Callable[[UUID], Awaitable[Any]]
+) -> dict[str, Any | RuntimeError]:
+    """ Make a per-user call for each of `user_ids`, `DIALOGUE_BATCH_SIZE` users per request to `batch_route` if there
+    is one, as `{user_id: result}`. Users the API refuses get its `RuntimeError` in place of their result. """
+    semaphore = asyncio.Semaphore(DIALOGUE_CONCURRENCY)
+
+    async def call_per_user(user_id: UUID) -> Any | RuntimeError:
+        async with semaphore:
+            try:
+                return await per_user_call(user_id)
+            except RuntimeError as e:
+                return e
+
+    async def run_batch(batch: list[UUID]) -> dict[str, Any | RuntimeError]:
+        batch_results = await _post_to_batch_route(
+            batch_route,
+            {'user_ids': [str(user_id) for user_id in batch]},
+            'DF_DISCORD_APP',
+            semaphore
+        )
+        if batch_results is not None:
+            return {
+                user_id: RuntimeError(result['detail']) if isinstance(result, dict) and 'detail' in result else result
+                for user_id, result in batch_results.items()
+            }
+
+        results = await asyncio.gather(*(call_per_user(user_id) for user_id in batch))
+        return {str(user_id): result for user_id, result in zip(batch, results)}
+
+    batches = [user_ids[i:i + DIALOGUE_BATCH_SIZE] for i in range(0, len(user_ids), DIALOGUE_BATCH_SIZE)]
+    results = {}
+    for batch_results in await asyncio.gather(*(run_batch(batch) for batch in batches)):
+        results.update(batch_results)
+    return results
+
+
+async def get_unseen_dialogue_for_users(user_ids: list[UUID]) -> dict[str, list[dict] | RuntimeError]:
+    """ Get the unseen dialogue of many users at once, as `{user_id: dialogues}` """
+    return await _for_users_in_batches(user_ids, UNSEEN_DIALOGUE_BATCH_ROUTE, get_unseen_dialogue_for_user)
+
+
+async def mark_dialogue_as_seen_for_users(user_ids: list[UUID]) -> dict[str, list[dict] | RuntimeError]:
+    """ Mark the dialogue of many users as seen at once, as `{user_id: result}` """
+    return await _for_users_in_batches(user_ids, MARK_DIALOGUE_SEEN_BATCH_ROUTE, mark_dialogue_as_seen)
+
+
 async def new_warehouse(sett_id: UUID, user_id: UUID) -> list[dict]:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.post(
-            url=f'{DF_API_HOST}/warehouse/new',
-            params={
-                'sett_id': sett_id
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    response = await client.post(
+        url=f'{DF_API_HOST}/warehouse/new',
+        params={
+            'sett_id': sett_id
+        },
+        headers=headers
+    )
 
     _check_code(response)
     return response.json()
@@ -596,14 +959,14 @@ async def new_warehouse(sett_id: UUID, user_id: UUID) -> list[dict]:
 
 async def get_warehouse(warehouse_id: UUID, user_id: UUID) -> list[dict]:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.get(
-            url=f'{DF_API_HOST}/warehouse/get',
-            params={
-                'warehouse_id': warehouse_id
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    response = await client.get(
+        url=f'{DF_API_HOST}/warehouse/get',
+        params={
+            'warehouse_id': warehouse_id
+        },
+        headers=headers
+    )
 
     _check_code(response)
     return response.json()
@@ -625,12 +988,12 @@ async def expand_warehouse(
     filtered_params = {key: value for key, value in params.items() if value is not None}
 
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.patch(
-            url=f'{DF_API_HOST}/warehouse/expand',
-            params=filtered_params,
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    response = await client.patch(
+        url=f'{DF_API_HOST}/warehouse/expand',
+        params=filtered_params,
+        headers=headers
+    )
 
     _check_code(response)
     return response.json()
@@ -644,20 +1007,21 @@ async def retrieve_cargo_from_warehouse(
         user_id: UUID
 ) -> list[dict]:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.patch(
-            url=f'{DF_API_HOST}/warehouse/cargo/retrieve',
-            params={
-                'warehouse_id': warehouse_id,
-                'convoy_id': convoy_id,
-                'cargo_id': cargo_id,
-                'quantity': quantity
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    requested_at = datetime.now(UTC)
+    response = await client.patch(
+        url=f'{DF_API_HOST}/warehouse/cargo/retrieve',
+        params={
+            'warehouse_id': warehouse_id,
+            'convoy_id': convoy_id,
+            'cargo_id': cargo_id,
+            'quantity': quantity
+        },
+        headers=headers
+    )
 
     _check_code(response)
-    return response.json()
+    return _cache_convoy_response(response, requested_at)
 
 
 async def store_cargo_in_warehouse(
@@ -668,20 +1032,21 @@ async def store_cargo_in_warehouse(
         user_id: UUID
 ) -> list[dict]:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.patch(
-            url=f'{DF_API_HOST}/warehouse/cargo/store',
-            params={
-                'warehouse_id': warehouse_id,
-                'convoy_id': convoy_id,
-                'cargo_id': cargo_id,
-                'quantity': quantity
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    requested_at = datetime.now(UTC)
+    response = await client.patch(
+        url=f'{DF_API_HOST}/warehouse/cargo/store',
+        params={
+            'warehouse_id': warehouse_id,
+            'convoy_id': convoy_id,
+            'cargo_id': cargo_id,
+            'quantity': quantity
+        },
+        headers=headers
+    )
 
     _check_code(response)
-    return response.json()
+    return _cache_convoy_response(response, requested_at)
 
 
 async def retrieve_vehicle_in_warehouse(
@@ -691,17 +1056,18 @@ async def retrieve_vehicle_in_warehouse(
         user_id: UUID
 ) -> list[dict]:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.patch(
-            url=f'{DF_API_HOST}/warehouse/vehicle/retrieve',
-            params={
-                'warehouse_id': warehouse_id,
-                'convoy_id': convoy_id,
-                'vehicle_id': vehicle_id
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    response = await client.patch(
+        url=f'{DF_API_HOST}/warehouse/vehicle/retrieve',
+        params={
+            'warehouse_id': warehouse_id,
+            'convoy_id': convoy_id,
+            'vehicle_id': vehicle_id
+        },
+        headers=headers
+    )
 
+    invalidate_convoy(convoy_id)
     _check_code(response)
     return response.json()
 
@@ -713,17 +1079,18 @@ async def store_vehicle_in_warehouse(
         user_id: UUID
 ) -> list[dict]:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.patch(
-            url=f'{DF_API_HOST}/warehouse/vehicle/store',
-            params={
-                'warehouse_id': warehouse_id,
-                'convoy_id': convoy_id,
-                'vehicle_id': vehicle_id
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    response = await client.patch(
+        url=f'{DF_API_HOST}/warehouse/vehicle/store',
+        params={
+            'warehouse_id': warehouse_id,
+            'convoy_id': convoy_id,
+            'vehicle_id': vehicle_id
+        },
+        headers=headers
+    )
 
+    invalidate_convoy(convoy_id)
     _check_code(response)
     return response.json()
 
@@ -735,19 +1102,20 @@ async def spawn_convoy_from_warehouse(
         user_id: UUID
 ) -> list[dict]:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.patch(
-            url=f'{DF_API_HOST}/warehouse/convoy/spawn',
-            params={
-                'warehouse_id': warehouse_id,
-                'vehicle_id': vehicle_id,
-                'new_convoy_name': new_convoy_name
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    requested_at = datetime.now(UTC)
+    response = await client.patch(
+        url=f'{DF_API_HOST}/warehouse/convoy/spawn',
+        params={
+            'warehouse_id': warehouse_id,
+            'vehicle_id': vehicle_id,
+            'new_convoy_name': new_convoy_name
+        },
+        headers=headers
+    )
 
     _check_code(response)
-    return response.json()
+    return _cache_convoy_response(response, requested_at)
 
 
 async def new_banner(
@@ -759,103 +1127,104 @@ async def new_banner(
         discord_id: int
 ) -> dict:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.post(
-            url=f'{DF_API_HOST}/banner/new',
-            params={
-                'name': name,
-                'description': description,
-                'banner_desc': banner_desc,
-                'public': public,
-                'discord_id': discord_id
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    response = await client.post(
+        url=f'{DF_API_HOST}/banner/new',
+        params={
+            'name': name,
+            'description': description,
+            'banner_desc': banner_desc,
+            'public': public,
+            'discord_id': discord_id
+        },
+        headers=headers
+    )
 
     _check_code(response)
     return response.json()
 
 
 async def get_banner_by_discord_id(discord_id: int) -> dict:
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.get(
-            url=f'{DF_API_HOST}/banner/get_by_discord_id',
-            params={
-                'discord_id': discord_id
-            }
-        )
+    client = http_client(DF_API_HOST)
+    response = await client.get(
+        url=f'{DF_API_HOST}/banner/get_by_discord_id',
+        params={
+            'discord_id': discord_id
+        }
+    )
 
     _check_code(response)
     return response.json()
 
 
 async def get_settlement_banner(sett_id: UUID) -> dict:
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.get(
-            url=f'{DF_API_HOST}/banner/settlement/get',
-            params={'sett_id': sett_id}
-        )
+    response = await coalesced_get(
+        url=f'{DF_API_HOST}/banner/settlement/get',
+        params={'sett_id': sett_id}
+    )
 
     _check_code(response)
     return response.json()
 
 
-async def get_banner_internal_leaderboard(banner_id: UUID, user_id: UUID) -> dict:
+async def _get_banner_leaderboard(kind: str, banner_id: UUID, user_id: UUID) -> leaderboards.RankedLeaderboard:
+    """ Get one of a banner's leaderboards (`kind` being `internal` or `global`), from cache if it's fresh enough.
+    It's ranked once when fetched, and the same ranked leaderboard is handed to everyone until it goes stale. """
+    cache_key = (kind, str(banner_id))
+    cached = _leaderboard_cache.get(cache_key)
+    if cached and datetime.now(UTC) - cached[1] < LEADERBOARD_CACHE_TTL:
+        return cached[0]
+
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.get(
-            url=f'{DF_API_HOST}/banner/leaderboard/internal',
-            params={
-                'banner_id': banner_id
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    response = await client.get(
+        url=f'{DF_API_HOST}/banner/leaderboard/{kind}',
+        params={
+            'banner_id': banner_id
+        },
+        headers=headers
+    )
 
     _check_code(response)
-    return response.json()
+    ranked = leaderboards.RankedLeaderboard(response.json())
+    _leaderboard_cache[cache_key] = (ranked, datetime.now(UTC))
+    return ranked
 
 
-async def get_banner_global_leaderboard(banner_id: UUID, user_id: UUID) -> dict:
-    headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.get(
-            url=f'{DF_API_HOST}/banner/leaderboard/global',
-            params={
-                'banner_id': banner_id
-            },
-            headers=headers
-        )
+async def get_banner_internal_leaderboard(banner_id: UUID, user_id: UUID) -> leaderboards.RankedLeaderboard:
+    return await _get_banner_leaderboard('internal', banner_id, user_id)
 
-    _check_code(response)
-    return response.json()
+
+async def get_banner_global_leaderboard(banner_id: UUID, user_id: UUID) -> leaderboards.RankedLeaderboard:
+    return await _get_banner_leaderboard('global', banner_id, user_id)
 
 
 async def form_allegiance(user_id: UUID, banner_id: UUID) -> dict:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.post(
-            url=f'{DF_API_HOST}/banner/allegiance/form',
-            params={
-                'banner_id': banner_id
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    response = await client.post(
+        url=f'{DF_API_HOST}/banner/allegiance/form',
+        params={
+            'banner_id': banner_id
+        },
+        headers=headers
+    )
 
+    for kind in ('internal', 'global'):  # The banner has a new member to rank
+        _leaderboard_cache.pop((kind, str(banner_id)), None)
     _check_code(response)
     return response.json()
 
 
 async def get_global_civic_leaderboard() -> dict:
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.get(url=f'{DF_API_HOST}/banner/leaderboard/civic/all')
+    response = await coalesced_get(url=f'{DF_API_HOST}/banner/leaderboard/civic/all')
 
     _check_code(response)
     return response.json()
 
 
 async def get_global_syndicate_leaderboard() -> dict:
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.get(url=f'{DF_API_HOST}/banner/leaderboard/syndicate/all')
+    response = await coalesced_get(url=f'{DF_API_HOST}/banner/leaderboard/syndicate/all')
 
     _check_code(response)
     return response.json()
@@ -863,14 +1232,14 @@ async def get_global_syndicate_leaderboard() -> dict:
 
 async def change_username(user_id: UUID, new_name: str) -> dict:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.patch(
-            url=f'{DF_API_HOST}/user/update_username',
-            params={
-                'new_name': new_name
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    response = await client.patch(
+        url=f'{DF_API_HOST}/user/update_username',
+        params={
+            'new_name': new_name
+        },
+        headers=headers
+    )
 
     _check_code(response)
     return response.json()
@@ -878,15 +1247,16 @@ async def change_username(user_id: UUID, new_name: str) -> dict:
 
 async def change_convoy_name(convoy_id: UUID, new_name: str, user_id: UUID) -> dict:
     headers = {'Authorization': f'Bearer {create_session(user_id)}'}
-    async with httpx.AsyncClient(verify=False) as client:
-        response = await client.patch(
-            url=f'{DF_API_HOST}/convoy/update_convoy_name',
-            params={
-                'convoy_id': convoy_id,
-                'new_name': new_name
-            },
-            headers=headers
-        )
+    client = http_client(DF_API_HOST)
+    response = await client.patch(
+        url=f'{DF_API_HOST}/convoy/update_convoy_name',
+        params={
+            'convoy_id': convoy_id,
+            'new_name': new_name
+        },
+        headers=headers
+    )
 
+    invalidate_convoy(convoy_id)
     _check_code(response)
     return response.json()
@@ -1,6 +1,7 @@
 # SPDX-FileCopyrightText: 2024-present Oori Data <info@oori.dev>
 # SPDX-License-Identifier: UNLICENSED
 from __future__                import annotations
+import                                asyncio
 
 import                                discord
 
@@ -8,6 +9,7 @@ from utiloori.ansi_color       import ansi_color
 
 from discord_app               import api_calls, handle_timeout, df_embed_author, validate_interaction, DF_LOGO_EMOJI, DF_GUILD_ID
 from discord_app.map_rendering import add_map_to_embed
+from discord_app.leaderboards  import RankedLeaderboard
 import                                discord_app.main_menu_menus
 import                                discord_app.vendor_menus.vendor_menus
 import                                discord_app.vendor_menus.buy_menus
@@ -20,37 +22,41 @@ from discord_app.df_state      import DFState
 async def banner_menu(df_state: DFState, follow_on_embeds: list[discord.Embed] | None = None, edit: bool=True):
     if df_state.convoy_obj:
         df_state.append_menu_to_back_stack(func=banner_menu)  # Add this menu to the back stack
-    if df_state.sett_obj:  # If there is a settlement's civic banner to join
+
+    civic_allegiance = _find_allegiance(df_state.user_obj, 'civic_allegiance')
+    guild_allegiance = _find_allegiance(df_state.user_obj, 'guild_allegiance')
+    syndicate_allegiance = _find_allegiance(df_state.user_obj, 'syndicate_allegiance')
+
+    async def load_sett_banner():
         df_state.sett_obj['banner'] = await api_calls.get_settlement_banner(df_state.sett_obj['sett_id'])
 
-    server_banner = None
-    if df_state.interaction.guild_id != DF_GUILD_ID:  # If in a different guild
+    async def load_server_banner() -> dict | None:
+        if df_state.interaction.guild_id == DF_GUILD_ID:  # Only other guilds have a server banner
+            return None
         try:
-            server_banner = await api_calls.get_banner_by_discord_id(df_state.interaction.guild_id)
+            return await api_calls.get_banner_by_discord_id(df_state.interaction.guild_id)
         except RuntimeError as e:
-            server_banner = None
+            return None
+
+    # None of these fetches depend on one another, so run them all at once
+    fetches = [
+        _load_banner_leaderboards(civic_allegiance, df_state.user_obj['user_id']),
+        _load_banner_leaderboards(guild_allegiance, df_state.user_obj['user_id'], include_global=False),
+        _load_banner_leaderboards(syndicate_allegiance, df_state.user_obj['user_id'])
+    ]
+    if df_state.sett_obj:  # If there is a settlement's civic banner to join
+        fetches.append(load_sett_banner())
+
+    server_banner, *_ = await asyncio.gather(load_server_banner(), *fetches)
 
     follow_on_embeds = [] if follow_on_embeds is None else follow_on_embeds
 
     embed = discord.Embed()
     embed = df_embed_author(embed, df_state)
 
-    if df_state.user_obj['civic_allegiance']:
-        civic_allegiance = next(
-            a for a in df_state.user_obj['allegiances']
-            if a['allegiance_id'] == df_state.user_obj['civic_allegiance']['allegiance_id']
-        )
-
-        civic_allegiance['banner']['internal_leaderboard'] = await api_calls.get_banner_internal_leaderboard(
-            civic_allegiance['banner']['banner_id'],
-            user_id=df_state.user_obj['user_id']
-        )
-        internal_leaderboard_position = civic_allegiance['banner']['internal_leaderboard'][df_state.user_obj['user_id']]['leaderboard_position']
-        civic_allegiance['banner']['global_leaderboard'] = await api_calls.get_banner_global_leaderboard(
-            civic_allegiance['banner']['banner_id'],
-            user_id=df_state.user_obj['user_id']
-        )
-        global_leaderboard_position = civic_allegiance['banner']['global_leaderboard'][civic_allegiance['banner']['banner_id']]['leaderboard_position']
+    if civic_allegiance:
+        internal_leaderboard_position = civic_allegiance['banner']['internal_leaderboard'].data[df_state.user_obj['user_id']]['leaderboard_position']
+        global_leaderboard_position = civic_allegiance['banner']['global_leaderboard'].data[civic_allegiance['banner']['banner_id']]['leaderboard_position']
 
         civic_banner_info = '\n'.join([
             f'- **{civic_allegiance['banner']['name']}**',
@@ -63,18 +69,8 @@ async def banner_menu(df_state: DFState, follow_on_embeds: list[discord.Embed] |
     else:
         civic_banner_info = '- N/a'
 
-    if df_state.user_obj['guild_allegiance']:
-        guild_allegiance = next(
-            a for a in df_state.user_obj['allegiances']
-            if a['allegiance_id'] == df_state.user_obj['guild_allegiance']['allegiance_id']
-        )
-
-        guild_allegiance['banner']['internal_leaderboard'] = await api_calls.get_banner_internal_leaderboard(
-            guild_allegiance['banner']['banner_id'],
-            user_id=df_state.user_obj['user_id']
-        )
-        internal_leaderboard_position = guild_allegiance['banner']['internal_leaderboard'][df_state.user_obj['user_id']]['leaderboard_position']
-        guild_allegiance['banner']['global_leaderboard'] = None
+    if guild_allegiance:
+        internal_leaderboard_position = guild_allegiance['banner']['internal_leaderboard'].data[df_state.user_obj['user_id']]['leaderboard_position']
 
         guild_banner_info = '\n'.join([
             f'- **{guild_allegiance['banner']['name']}**',
@@ -86,22 +82,9 @@ async def banner_menu(df_state: DFState, follow_on_embeds: list[discord.Embed] |
     else:
         guild_banner_info = '- N/a'
 
-    if df_state.user_obj['syndicate_allegiance']:
-        syndicate_allegiance = next(
-            a for a in df_state.user_obj['allegiances']
-            if a['allegiance_id'] == df_state.user_obj['syndicate_allegiance']['allegiance_id']
-        )
-
-        syndicate_allegiance['banner']['internal_leaderboard'] = await api_calls.get_banner_internal_leaderboard(
-            syndicate_allegiance['banner']['banner_id'],
-            user_id=df_state.user_obj['user_id']
-        )
-        internal_leaderboard_position = syndicate_allegiance['banner']['internal_leaderboard'][df_state.user_obj['user_id']]['leaderboard_position']
-        syndicate_allegiance['banner']['global_leaderboard'] = await api_calls.get_banner_global_leaderboard(
-            syndicate_allegiance['banner']['banner_id'],
-            user_id=df_state.user_obj['user_id']
-        )
-        global_leaderboard_position = syndicate_allegiance['banner']['global_leaderboard'][syndicate_allegiance['banner']['banner_id']]['leaderboard_position']
+    if syndicate_allegiance:
+        internal_leaderboard_position = syndicate_allegiance['banner']['internal_leaderboard'].data[df_state.user_obj['user_id']]['leaderboard_position']
+        global_leaderboard_position = syndicate_allegiance['banner']['global_leaderboard'].data[syndicate_allegiance['banner']['banner_id']]['leaderboard_position']
 
         syndicate_banner_info = '\n'.join([
             f'- **{syndicate_allegiance['banner']['name']}**',
@@ -137,73 +120,65 @@ async def banner_menu(df_state: DFState, follow_on_embeds: list[discord.Embed] |
     else:
         await df_state.interaction.followup.send(embed=embed, view=view)
 
+def _find_allegiance(user_obj: dict, allegiance_type: str) -> dict | None:
+    """ Get the user's full allegiance of `allegiance_type` (e.g. `civic_allegiance`), if they have one """
+    if not user_obj[allegiance_type]:
+        return None
+    return next(
+        a for a in user_obj['allegiances']
+        if a['allegiance_id'] == user_obj[allegiance_type]['allegiance_id']
+    )
+
+async def _load_banner_leaderboards(allegiance: dict | None, user_id: str, include_global: bool = True):
+    """ Fetch the leaderboards of an allegiance's banner onto it, concurrently """
+    if allegiance is None:
+        return
+
+    banner = allegiance['banner']
+    fetches = [api_calls.get_banner_internal_leaderboard(banner['banner_id'], user_id=user_id)]
+    if include_global:
+        fetches.append(api_calls.get_banner_global_leaderboard(banner['banner_id'], user_id=user_id))
+
+    leaderboards = await asyncio.gather(*fetches)
+    banner['internal_leaderboard'] = leaderboards[0]
+    banner['global_leaderboard'] = leaderboards[1] if include_global else None
+
 # --- LEADERBOARD UTILITY FUNCTIONS ---
 
-def create_condensed_internal_leaderboard(internal_leaderboard_data: dict, allegiance_id: str) -> list[str]:
+def _condense_leaderboard(ranked: RankedLeaderboard, focus_id: str) -> list[str]:
     """
-    Creates a condensed list of user IDs for an internal banner leaderboard display.
-    Highlights top 3, and the area around the specified allegiance's user.
+    Pick the entries of a condensed leaderboard: the top 3, plus the entries around `focus_id`.
+    If `focus_id` is in the top 5, 4th and 5th place are shown instead; otherwise an ellipsis marks the gap.
     """
-    condensed_internal_leaderboard = []
-    allegiance_pos = None
+    focus_pos = ranked.position(focus_id)
+    condensed = ranked.top_positions(3)
 
-    # Sort by leaderboard_position to ensure consistent processing
-    sorted_spots = sorted(internal_leaderboard_data.items(), key=lambda item: item[1]['leaderboard_position'])
+    if focus_pos <= 5:
+        condensed.extend(entry_id for entry_id in ranked.top_positions(5) if entry_id not in condensed)
+    else:
+        last_top_pos = ranked.position(condensed[-1]) if condensed else 0
+        if focus_pos - 1 > last_top_pos + 1:  # If there's a gap between the top 3 and the focus' neighbours
+            condensed.append('…')
+        condensed.extend(entry_id for entry_id in ranked.around(focus_id) if entry_id not in condensed)
 
-    for user_id, spot in sorted_spots:  # Find allegiance position
-        if spot['allegiance']['allegiance_id'] == allegiance_id:
-            allegiance_pos = spot['leaderboard_position']
-            break
+    return condensed
 
-    if allegiance_pos is None:  # Should not happen if allegiance_id is valid
-        # Fallback: just take top 5 if user not found for some reason
-        return [user_id for user_id, spot in sorted_spots[:5]]
 
-    # Collect user_ids for display
-    processed_user_ids = set()
+def create_condensed_internal_leaderboard(ranked: RankedLeaderboard, allegiance_id: str) -> list[str]:
+    """
+    Creates a condensed list of user IDs for an internal banner leaderboard display.
+    Highlights top 3, and the area around the specified allegiance's user.
+    """
+    allegiance_user_id = next((  # Find allegiance position
+        user_id for user_id, spot in ranked.data.items()
+        if spot['allegiance']['allegiance_id'] == allegiance_id and user_id in ranked.rank_index
+    ), None)
 
-    # Add top 3
-    for user_id, spot in sorted_spots:
-        if spot['leaderboard_position'] <= 3:
-            condensed_internal_leaderboard.append(user_id)
-            processed_user_ids.add(user_id)
-        else:
-            break  # Already sorted, so we can break
-
-    if allegiance_pos <= 5:  # Add 4th and 5th place if allegiance is in top 5 and not already added
-        for user_id, spot in sorted_spots:
-            if 3 < spot['leaderboard_position'] <= 5 and user_id not in processed_user_ids:
-                condensed_internal_leaderboard.append(user_id)
-                processed_user_ids.add(user_id)
-    else:  # Allegiance is outside top 5
-        # Check if there's a gap between top 3 and user's surrounding positions
-        # Ensure condensed_internal_leaderboard is not empty before accessing its last element
-        if condensed_internal_leaderboard:
-            last_top_pos = internal_leaderboard_data[condensed_internal_leaderboard[-1]]['leaderboard_position']
-            if allegiance_pos -1 > last_top_pos + 1:
-                condensed_internal_leaderboard.append('…')
-        elif allegiance_pos > 1:  # If top 3 was empty and user is not  #1, ellipsis might be needed
-             condensed_internal_leaderboard.append('…')
-
-
-        for user_id, spot in sorted_spots:  # Add the users around allegiance position
-            if spot['leaderboard_position'] in [allegiance_pos - 1, allegiance_pos, allegiance_pos + 1] and \
-               user_id not in processed_user_ids:
-                condensed_internal_leaderboard.append(user_id)
-                processed_user_ids.add(user_id)
-
-    # Ensure unique entries while preserving order for '…'
-    final_list = []
-    seen = set()
-    for item in condensed_internal_leaderboard:
-        if item == '…':
-            if 'ellipsis' not in seen:  # Allow only one ellipsis
-                final_list.append(item)
-                seen.add('ellipsis')
-        elif item not in seen:
-            final_list.append(item)
-            seen.add(item)
-    return final_list
+    if allegiance_user_id is None:  # Should not happen if allegiance_id is valid
+        # Fallback: just take top 5 if user not found for some reason
+        return ranked.top(5)
+
+    return _condense_leaderboard(ranked, allegiance_user_id)
 
 
 def format_internal_leaderboard_for_display(internal_leaderboard_data: dict, condensed_user_ids: list[str], user_id_to_highlight: str) -> list[str]:
@@ -264,67 +239,12 @@ def format_internal_leaderboard_for_display(internal_leaderboard_data: dict, con
     return internal_formatted_output
 
 
-def create_condensed_global_leaderboard(global_leaderboard_data: dict, allegiance_banner_id: str) -> list[str]:
+def create_condensed_global_leaderboard(ranked: RankedLeaderboard, allegiance_banner_id: str) -> list[str]:
     """ Creates a condensed list of banner IDs for a global leaderboard display, focusing on a specific banner. """
-    # This is a direct port of the logic from banner_menus, assuming it's sufficient.
-    condensed_global_leaderboard = []
-    allegiance_pos = None
-    
-    sorted_banners = sorted(global_leaderboard_data.items(), key=lambda item: item[1]['leaderboard_position'])
-
-    for banner_id, spot in sorted_banners:
-        if banner_id == allegiance_banner_id:
-            allegiance_pos = spot['leaderboard_position']
-        if spot['leaderboard_position'] <= 3:
-            if banner_id not in condensed_global_leaderboard:  # Avoid duplicates if allegiance banner is in top 3
-                condensed_global_leaderboard.append(banner_id)
-
-    if allegiance_pos is None:
+    if allegiance_banner_id not in ranked.rank_index:
         return []  # Allegiance banner not found
 
-    if allegiance_pos <= 5:
-        for banner_id, spot in sorted_banners:
-            if 3 < spot['leaderboard_position'] <= 5 and banner_id not in condensed_global_leaderboard:
-                condensed_global_leaderboard.append(banner_id)
-    else:  # Allegiance banner is outside top 5
-        # Check if ellipsis is needed
-        last_top_pos = 0
-        if condensed_global_leaderboard:  # If top 3 were added
-            # Get the position of the last banner added from top 3
-            last_top_banner_id = condensed_global_leaderboard[-1]
-            if last_top_banner_id in global_leaderboard_data:
-                 last_top_pos = global_leaderboard_data[last_top_banner_id]['leaderboard_position']
-        
-        if allegiance_pos -1 > last_top_pos + 1 :  # If there's a gap
-            condensed_global_leaderboard.append('…')
-
-        for banner_id, spot in sorted_banners:
-            if spot['leaderboard_position'] in [allegiance_pos - 1, allegiance_pos, allegiance_pos + 1] and \
-               banner_id not in condensed_global_leaderboard:
-                condensed_global_leaderboard.append(banner_id)
-    
-    # Ensure unique entries while preserving order for '…'
-    final_list = []
-    seen_items = set()
-    # Sort by original position before final processing to maintain visual order
-    # Need a way to sort '...' appropriately or handle its insertion carefully.
-    # For now, rely on the construction logic for order.
-    
-    # Re-sort based on actual position for items that are not '...'
-    # This is tricky because '...' breaks direct sorting.
-    # The create_condensed logic should ideally place '...' correctly.
-    
-    # Simple uniqueness filter, assuming create_condensed handles order
-    for item in condensed_global_leaderboard:
-        if item == '…':
-            if 'ellipsis' not in seen_items:
-                final_list.append(item)
-                seen_items.add('ellipsis')  # Use a generic key for ellipsis
-        elif item not in seen_items:
-            final_list.append(item)
-            seen_items.add(item)
-            
-    return final_list
+    return _condense_leaderboard(ranked, allegiance_banner_id)
 
 
 def format_global_leaderboard_for_display(global_leaderboard_data: dict, condensed_banner_ids: list[str], banner_id_to_highlight: str) -> list[str]:
@@ -399,18 +319,13 @@ def format_top_n_global_leaderboard(leaderboard_data: dict, top_n: int = 10, sou
     if not leaderboard_data:
         return ['-# No data available.']
 
-    valid_entries = [entry for entry in leaderboard_data.values() if 'leaderboard_position' in entry and 'name' in entry]
-    
-    sorted_entries = sorted(
-        valid_entries,
-        key=lambda x: x['leaderboard_position']
-    )
+    ranked = RankedLeaderboard(leaderboard_data)  # Each fetch is only formatted once, so there's nothing to reuse
+    valid_entries = (ranked.data[entry_id] for entry_id in ranked.ranked_ids if 'name' in ranked.data[entry_id])
 
     output_lines = []
-    for i, entry in enumerate(sorted_entries):
-        if i >= top_n:
-            if len(sorted_entries) > top_n:
-                output_lines.append('-# ...and more!')
+    for i, entry in enumerate(valid_entries):
+        if i >= top_n:  # There's at least one more valid entry
+            output_lines.append('-# ...and more!')
             break
 
         pos = entry['leaderboard_position']
@@ -660,18 +575,18 @@ async def banner_inspect_menu(df_state: DFState, banner: dict):
         f'*{banner['description']}*',
         '### Internal Player leaderboard',
         '\n'.join(format_internal_leaderboard_for_display(
-            internal_leaderboard_data=allegiance['banner']['internal_leaderboard'],
+            internal_leaderboard_data=allegiance['banner']['internal_leaderboard'].data,
             condensed_user_ids=create_condensed_internal_leaderboard(
-                internal_leaderboard_data=allegiance['banner']['internal_leaderboard'],
+                ranked=allegiance['banner']['internal_leaderboard'],
                 allegiance_id=allegiance['allegiance_id']
             ),
             user_id_to_highlight=allegiance['user_id']
         )),
         '### Global Banner leaderboard',
         '\n'.join(format_global_leaderboard_for_display(
-            global_leaderboard_data=allegiance['banner']['global_leaderboard'],
+            global_leaderboard_data=allegiance['banner']['global_leaderboard'].data,
             condensed_banner_ids=create_condensed_global_leaderboard(
-                global_leaderboard_data=allegiance['banner']['global_leaderboard'],
+                ranked=allegiance['banner']['global_leaderboard'],
                 allegiance_banner_id=allegiance['banner']['banner_id']
             ),
             banner_id_to_highlight=allegiance['banner']['banner_id']
@@ -723,8 +638,8 @@ async def leaderboard_inspect_menu(df_state: DFState, banner: dict):
     ])
 
     if allegiance:
-        internal_leaderboard_position = allegiance['banner']['internal_leaderboard'][df_state.user_obj['user_id']]['leaderboard_position']
-        global_leaderboard_position = allegiance['banner']['global_leaderboard'][allegiance['banner']['banner_id']]['leaderboard_position']
+        internal_leaderboard_position = allegiance['banner']['internal_leaderboard'].data[df_state.user_obj['user_id']]['leaderboard_position']
+        global_leaderboard_position = allegiance['banner']['global_leaderboard'].data[allegiance['banner']['banner_id']]['leaderboard_position']
 
         allegiance_stats = '\n'.join([
             '### Leaderboard',
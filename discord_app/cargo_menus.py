@@ -32,7 +32,8 @@ async def cargo_menu(df_state: DFState):
     if df_state.cargo_obj['recipient']:
         recipient_vendor_obj = await api_calls.get_vendor(
             vendor_id=df_state.cargo_obj['recipient'],
-            user_id=df_state.user_obj['user_id']
+            user_id=df_state.user_obj['user_id'],
+            identity_only=True
         )
     else:
         recipient_vendor_obj = {}
@@ -11,7 +11,7 @@ import                                logging
 from utiloori.ansi_color       import ansi_color
 
 from discord_app               import (
-    api_calls, dialogue_menus, handle_timeout, discord_timestamp, df_embed_author, add_tutorial_embed,
+    api_calls, map_cache, dialogue_menus, handle_timeout, discord_timestamp, df_embed_author, add_tutorial_embed,
     get_user_metadata, validate_interaction, DF_LOGO_EMOJI, OORI_WHITE, get_vehicle_emoji, get_settlement_emoji,
     get_cargo_emoji, create_paginated_select_options
 )
@@ -21,6 +21,7 @@ import discord_app.vendor_menus.buy_menus
 from discord_app.map_rendering import add_map_to_embed
 from discord_app.nav_menus     import add_nav_buttons
 from discord_app.df_state      import DFState
+from discord_app.poll_schedule import notification_poll_schedule
 
 API_SUCCESS_CODE = 200
 API_UNPROCESSABLE_ENTITY_CODE = 422
@@ -126,7 +127,8 @@ async def make_convoy_embed(
             route_tiles.append((x, y))
             pos += 1
 
-        destination = await api_calls.get_tile(
+        destination = await map_cache.get_tile(
+            map_obj=df_state.map_obj,
             x=journey['dest_x'],
             y=journey['dest_y'],
             user_id=df_state.user_obj['user_id']
@@ -180,7 +182,8 @@ async def make_convoy_embed(
             route_tiles.append((x, y))
             pos += 1
 
-        destination = await api_calls.get_tile(
+        destination = await map_cache.get_tile(
+            map_obj=df_state.map_obj,
             x=prospective_journey_plus_misc['journey']['dest_x'],
             y=prospective_journey_plus_misc['journey']['dest_y'],
             user_id=df_state.user_obj['user_id']
@@ -400,7 +403,8 @@ class ConvoyView(discord.ui.View):
         for cargo in cargo_for_delivery:  # For each deliverable cargo, get vendor's details and add it to destinations
             recipient_vendor = await api_calls.get_vendor(
                 vendor_id=cargo['recipient'],
-                user_id=self.df_state.user_obj['user_id']
+                user_id=self.df_state.user_obj['user_id'],
+                identity_only=True  # Only the name and position are needed
             )
 
             # Grab destination name to display to user
@@ -640,9 +644,7 @@ class DestinationSelect(discord.ui.Select):
                 ],
                 '🏭' if sett['sett_id'] in warehouse_sett_ids else get_settlement_emoji(sett['sett_type'])
             )
-            for row in self.df_map['tiles']
-            for tile in row
-            for sett in tile['settlements']
+            for sett in map_cache.map_index(self.df_map).settlements
             if not (sett['x'] == convoy_x and sett['y'] == convoy_y)  # Exclude settlements on the same tile as convoy
             and 'tutorial' not in sett['name'].lower()                # Exclude settlements with "tutorial" in their name
         ]
@@ -1056,6 +1058,9 @@ class ConfirmJourneyButton(discord.ui.Button):
             await interaction.response.send_message(content=e, ephemeral=True)
             return
 
+        if self.df_state.convoy_obj.get('journey'):  # Poll for the arrival notification on time, not at the next idle poll
+            notification_poll_schedule.expect_arrival(self.df_state.user_obj['user_id'], self.df_state.convoy_obj['journey']['eta'])
+
         await convoy_menu(self.df_state)
 
     async def on_timeout(self):
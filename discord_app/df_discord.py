@@ -3,6 +3,7 @@
 import                                  os
 import                                  asyncio
 import                                  logging
+from collections                 import deque
 from datetime                    import datetime, timezone, timedelta, time
 from zoneinfo                    import ZoneInfo  # For timezone-aware scheduling
 
@@ -15,6 +16,7 @@ from httpx                       import ConnectError, ConnectTimeout
 from utiloori.ansi_color         import ansi_color
 
 from discord_app                 import DF_DISCORD_LOGO as API_BANNER
+from discord_app                 import DF_TEXT_LOGO_URL, EMBED_IMAGES_BY_URL, get_image_bytes
 from discord_app                 import (
     DF_GUILD_ID,
     DF_CHANNEL_ID, DF_WELCOME_CHANNEL_ID,
@@ -24,15 +26,29 @@ from discord_app                 import (
     MOUNTAIN_TIME, DF_LEADERBOARD_CHANNEL_ID,
     SERVER_NOTIFICATION_VALUE, DM_NOTIFICATION_VALUE
 )
-from discord_app                 import TimeoutView, api_calls, DF_HELP, discord_timestamp
+from discord_app                 import TimeoutView, api_calls, map_cache, message_scheduler, outbox, reference_data, snapshot, DF_HELP, discord_timestamp
 from discord_app.banner_menus    import format_top_n_global_leaderboard
 from discord_app.map_rendering   import add_map_to_embed
 from discord_app.main_menu_menus import main_menu
+from discord_app.poll_schedule   import notification_poll_schedule
+from discord_app.push_receiver   import PushReceiver, PUSH_RECEIVER_PORT
 from discord_app.dialogue_menus  import RespondToConvoyView
 
 DF_API_HOST = os.environ['DF_API_HOST']
 LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
 DISCORD_TOKEN = os.environ['DISCORD_TOKEN']
+MAP_REFRESH_MINUTES = int(os.environ.get('DF_MAP_REFRESH_MINUTES', '10'))
+NOTIFIER_CONCURRENCY = int(os.environ.get('DF_NOTIFIER_CONCURRENCY', '16'))  # Users notified at once
+NOTIFIER_CYCLE_DEADLINE = timedelta(seconds=int(os.environ.get('DF_NOTIFIER_CYCLE_DEADLINE_SECONDS', '50')))  # Under the 1 minute interval
+# With the push receiver running, polling is only a safety net for events which never arrive
+PUSH_SAFETY_NET_POLL_MINUTES = int(os.environ.get('DF_PUSH_SAFETY_NET_POLL_MINUTES', '10'))
+USER_CACHE_SYNC_MINUTES = int(os.environ.get('DF_USER_CACHE_SYNC_MINUTES', '15'))
+# Incremental syncs can't see users who've dropped out, or Discord users the bot couldn't see before; full ones can
+USER_CACHE_FULL_SYNC_INTERVAL = timedelta(hours=int(os.environ.get('DF_USER_CACHE_FULL_SYNC_HOURS', '6')))
+# Discord rate limits role changes per guild; stay under it rather than waiting out 429s
+ROLE_ASSIGNMENTS_PER_SECOND = float(os.environ.get('DF_ROLE_ASSIGNMENTS_PER_SECOND', '0.5'))
+ROLE_ASSIGNMENT_BURST = int(os.environ.get('DF_ROLE_ASSIGNMENT_BURST', '5'))
+PUSH_BATCH_DELAY = timedelta(seconds=float(os.environ.get('DF_PUSH_BATCH_DELAY_SECONDS', '1')))  # Gather bursts of pushed events into one cycle
 
 logger = logging.getLogger('DF_Discord')
 logging.basicConfig(format='%(levelname)s:%(name)s: %(message)s', level=LOG_LEVEL)
@@ -44,6 +60,21 @@ class DesolateCog(commands.Cog):
         self.message_history_limit = 1
         self.ephemeral = True
         self.cache_ready = asyncio.Event()
+        self.df_users_by_id: dict[str, dict] = {}  # Every DF user as of the last sync, to diff the next one against
+        self.users_synced_at: datetime | None = None  # Watermark for incremental syncs
+        self.users_full_synced_at: datetime | None = None
+        self.role_queue: asyncio.Queue[discord.Member] = asyncio.Queue()
+        self.queued_role_member_ids: set[int] = set()
+        self.role_assignment_task: asyncio.Task | None = None
+        self.notifier_carry_over: list[discord.User] = []  # Users the last notifier cycle didn't reach before its deadline
+        self.notifier_last_duration: timedelta | None = None
+        self.message_scheduler = message_scheduler.MessageScheduler()  # All of the bot's unprompted messages go out through here
+        self.notification_outbox = outbox.NotificationOutbox()  # Survives restarts, so notifications are neither lost nor repeated
+        self.notifier_lock = asyncio.Lock()  # Pushed events and the polling loop both run notifier cycles; one at a time
+        self.push_receiver: PushReceiver | None = None
+        self.push_wakeup = asyncio.Event()
+        self.push_cycles_task: asyncio.Task | None = None
+        self.logo_preload_task: asyncio.Task | None = None
 
     @commands.Cog.listener()
     async def on_ready(self):
@@ -61,40 +92,94 @@ class DesolateCog(commands.Cog):
         logger.info(ansi_color(f'Welcome channel:  #{self.bot.get_channel(DF_WELCOME_CHANNEL_ID).name}', 'purple'))
         logger.info(ansi_color(f'DF API: {DF_API_HOST}', 'purple'))
 
+        api_calls.open_http_clients()  # Pooled HTTP clients live as long as the cog does
+
+        if not EMBED_IMAGES_BY_URL and self.logo_preload_task is None:  # In the background, so it doesn't hold up boot
+            self.logo_preload_task = asyncio.create_task(self.preload_logo())
+
+        logger.debug(ansi_color('Initializing reference data loop…', 'yellow'))
+        self.refresh_reference_data.start()  # First iteration loads the reference data
+
         logger.debug(ansi_color('Initializing settlements cache…', 'yellow'))
-        self.settlements_cache = []
         self.df_map_obj = None
+        snapshot_map = snapshot.load_map()
+        if snapshot_map:  # Serve from the last good map right away; `refresh_map` reconciles it with the live one
+            logger.info(ansi_color('Loaded map from snapshot', 'green'))
+            self.set_map(snapshot_map, from_snapshot=True)
         while not self.df_map_obj:  # Retry logic for bootup
             try:
-                self.df_map_obj = await api_calls.get_map()
+                self.set_map(await api_calls.get_map())
             except ConnectError as e:
                 logger.error(ansi_color(f'Error connecting to DF API: {e}', 'red'))
                 await asyncio.sleep(3)  # Wait 3 seconds before trying again
             except ConnectTimeout as e:
                 logger.error(ansi_color(f'Timeout connecting to DF API: {e}', 'red'))
                 await asyncio.sleep(3)  # Wait 3 seconds before trying again
-
-        for row in self.df_map_obj['tiles']:
-            for sett in row:
-                self.settlements_cache.extend(sett['settlements'])
+            else:
+                await snapshot.save_map(self.df_map_obj)
 
         self.find_roles()
 
         logger.debug(ansi_color('Initializing users cache…', 'yellow'))
         self.df_users_cache = None
+        snapshot_users = snapshot.load_users()
+        if snapshot_users is not None:  # `update_user_cache` reconciles these with the live users in the background
+            self.df_users_cache = {}
+            self.df_users_by_id = {str(user['user_id']): user for user in snapshot_users}
+            self.cache_users(snapshot_users)
+            logger.info(ansi_color(f'Loaded {len(self.df_users_cache)} users from snapshot', 'green'))
+            self.cache_ready.set()
         self.update_user_cache.start()
         await self.cache_ready.wait()  # Wait until cache is initialized
 
         self.bot.add_view(TimeoutView(self.df_users_cache))
 
+        if PUSH_RECEIVER_PORT and self.push_receiver is None:
+            logger.debug(ansi_color('Initializing push receiver…', 'yellow'))
+            self.push_receiver = PushReceiver(self.on_pushed_dialogue)
+            await self.push_receiver.start()
+            self.push_cycles_task = asyncio.create_task(self.run_pushed_cycles())
+            self.notifier.change_interval(minutes=PUSH_SAFETY_NET_POLL_MINUTES)
+
         logger.debug(ansi_color('Initializing notification loop…', 'yellow'))
         self.notifier.start()
 
         logger.debug(ansi_color('Initializing leaderboards loop…', 'yellow'))
         self.post_leaderboards.start()
 
+        logger.debug(ansi_color('Initializing map refresh loop…', 'yellow'))
+        self.refresh_map.start()
+
         logger.log(1337, ansi_color('\n\n' + API_BANNER + '\n', 'green', 'black'))  # Display the cool DF banner
 
+    async def cog_unload(self):
+        """ Called when the cog is removed, including when the bot shuts down """
+        if self.push_receiver:
+            await self.push_receiver.close()
+        if self.push_cycles_task:
+            self.push_cycles_task.cancel()
+        if self.role_assignment_task:
+            self.role_assignment_task.cancel()
+        if self.logo_preload_task:
+            self.logo_preload_task.cancel()
+        await self.message_scheduler.close()
+        self.notification_outbox.close()
+        await api_calls.close_http_clients()
+        logger.info(ansi_color('Closed pooled HTTP clients', 'yellow'))
+
+    async def preload_logo(self):
+        """ Warm up the image cache so the first main menu doesn't have to download the logo """
+        try:
+            await get_image_bytes(DF_TEXT_LOGO_URL)
+        except Exception as e:
+            logger.warning(ansi_color(f'Could not preload the DF text logo, will retry on first use: {e}', 'yellow'))
+
+    def set_map(self, map_obj: dict, from_snapshot: bool = False):
+        """ Swap in a new map and rebuild everything derived from it """
+        self.settlements_cache = map_cache.map_index(map_obj).settlements  # Index the map once per load
+        self.map_from_snapshot = from_snapshot
+        self.df_map_obj = map_obj  # Single assignment, so menus only ever see the old map or the new one
+
     def find_roles(self):
         """ Cache player roles """
         guild: discord.Guild = self.bot.get_guild(DF_GUILD_ID)
@@ -207,31 +292,107 @@ class DesolateCog(commands.Cog):
         except Exception as e:
             logger.error(ansi_color(f'Failed to send welcome message for {member.name} ({member.id}) to  #{welcome_channel.name}: {e}', 'red'))
 
-    @tasks.loop(minutes=15)
+    @tasks.loop(minutes=USER_CACHE_SYNC_MINUTES)
     async def update_user_cache(self):
+        try:  # An exception escaping a `tasks.loop` stops it for good
+            await self.sync_user_cache()
+        except Exception as e:
+            logger.error(ansi_color(f'Error syncing user cache, keeping the current one: {e}', 'red'))
+
+    async def sync_user_cache(self):
         if not isinstance(self.df_users_cache, dict):  # Initialize cache if not already a dictionary
             self.df_users_cache = {}
-            initial_setup = True
-        else:
-            initial_setup = False
-            await asyncio.sleep(55)  # Sleep so the updating of the user cache doesn't overlap with the notifier
+        initial_setup = not self.cache_ready.is_set()
 
         guild: discord.Guild = self.bot.get_guild(DF_GUILD_ID)
 
-        async def add_discord_roles(member):
-            user_role_ids = [role.id for role in member.roles]
-            if WASTELANDER_ROLE not in user_role_ids:
-                try:
-                    await member.add_roles(*[self.wastelander_role, self.beta_role])
-                except HTTPException as e:
-                    logger.error(ansi_color(f'Couldn\'t add Player/Beta roles to user {member.display_name}: {e}', 'red'))
-
-        discord_users_dict = await api_calls.get_discord_users()
+        requested_at = datetime.now(timezone.utc)  # Taken before the request, so changes made during it aren't missed
+        full_sync = (
+            self.users_full_synced_at is None
+            or not api_calls.DISCORD_USERS_UPDATED_SINCE_PARAM
+            or requested_at - self.users_full_synced_at >= USER_CACHE_FULL_SYNC_INTERVAL
+        )
+        while True:
+            try:
+                discord_users_dict = await api_calls.get_discord_users(updated_since=None if full_sync else self.users_synced_at)
+                break
+            except Exception as e:
+                logger.error(ansi_color(f'Error fetching users, keeping the current user cache: {e}', 'red'))
+                if not initial_setup:
+                    return  # Try again at the next sync
+                await asyncio.sleep(3)  # Nothing to serve yet; retry soon, like the boot-time map load
         server_notification_users = discord_users_dict['server_notifications']
         dm_notification_users = discord_users_dict['dm_notifications']
+        fetched_users = server_notification_users + dm_notification_users
+
+        changed_users = [user for user in fetched_users if self.df_users_by_id.get(str(user['user_id'])) != user]
+        removed_user_ids = set()
+        if full_sync:  # Only a full list shows who has dropped out (e.g. turned notifications off)
+            removed_user_ids = self.df_users_by_id.keys() - {str(user['user_id']) for user in fetched_users}
+        for user_id in removed_user_ids:
+            self.uncache_user(self.df_users_by_id.pop(user_id))
+        for user in changed_users:
+            previous_user = self.df_users_by_id.get(str(user['user_id']))
+            if previous_user and previous_user['discord_id'] != user['discord_id']:
+                self.uncache_user(previous_user)
+            self.df_users_by_id[str(user['user_id'])] = user
+
+        # A full sync re-checks everyone, picking up Discord users who weren't visible (or in the guild) last time
+        for discord_user in self.cache_users(fetched_users if full_sync else changed_users):
+            member = guild.get_member(discord_user.id)
+            if member and WASTELANDER_ROLE not in [role.id for role in member.roles]:
+                self.queue_role_assignment(member)
+
+        # Fresh user data may show journeys the poll schedule doesn't know about yet
+        for df_user in changed_users:
+            notification_poll_schedule.refresh(df_user, requested_at)
+        notification_poll_schedule.retain(set(self.df_users_by_id))
+
+        if changed_users or removed_user_ids:
+            await snapshot.save_users(list(self.df_users_by_id.values()))
+
+        self.users_synced_at = requested_at
+        if full_sync:
+            self.users_full_synced_at = requested_at
+        logger.info(ansi_color(
+            f'{'Full' if full_sync else 'Incremental'} user sync: fetched {len(fetched_users)} users, '
+            f'{len(changed_users)} new or changed, {len(removed_user_ids)} removed',
+            'cyan'
+        ))
 
-        discord_notification_users = server_notification_users + dm_notification_users
-        for user in discord_notification_users:
+        if initial_setup:
+            logger.info(ansi_color('User cache initialization complete', 'green'))
+            self.cache_ready.set()  # Signal that the cache is ready
+
+    def queue_role_assignment(self, member: discord.Member):
+        """ Queue giving a member the Player/Beta roles, unless they're already queued """
+        if member.id in self.queued_role_member_ids:
+            return
+        self.queued_role_member_ids.add(member.id)
+        self.role_queue.put_nowait(member)
+        if self.role_assignment_task is None:
+            self.role_assignment_task = asyncio.create_task(self.assign_queued_roles())
+
+    async def assign_queued_roles(self):
+        """ Work through the role queue, paced to stay under Discord's rate limit """
+        bucket = message_scheduler.TokenBucket(ROLE_ASSIGNMENTS_PER_SECOND, ROLE_ASSIGNMENT_BURST)
+        while True:
+            member = await self.role_queue.get()
+            self.queued_role_member_ids.discard(member.id)
+            if WASTELANDER_ROLE in [role.id for role in member.roles]:  # Got them some other way while queued
+                continue
+            await bucket.take()
+            try:
+                await member.add_roles(*[self.wastelander_role, self.beta_role])
+            except HTTPException as e:
+                logger.error(ansi_color(f'Couldn\'t add Player/Beta roles to user {member.display_name}: {e}', 'red'))
+            except Exception as e:
+                logger.error(ansi_color(f'Error adding roles to {member.name} ({member.id}): {e}', 'red'))
+
+    def cache_users(self, df_users: list[dict]) -> list[discord.User]:
+        """ Add DF users to the user cache, keyed by their Discord user. Returns the Discord users which were cached. """
+        cached_discord_users = []
+        for user in df_users:
             try:
                 discord_user = self.bot.get_user(user['discord_id'])
                 if not discord_user:  # If the Discord user for that ID is not found
@@ -240,98 +401,275 @@ class DesolateCog(commands.Cog):
                     continue
 
                 self.df_users_cache[discord_user] = user  # Use Discord user as key, DF user as value
-
-                member = guild.get_member(discord_user.id)
-                if member:
-                    await add_discord_roles(member)
+                cached_discord_users.append(discord_user)
             except Exception as e:
                 logger.error(ansi_color(f'Error adding DF user {user['username']} ({user['user_id']} to user cache: {e}', 'red'))
+        return cached_discord_users
 
-        if initial_setup:
-            logger.info(ansi_color('User cache initialization complete', 'green'))
-            self.cache_ready.set()  # Signal that the cache is ready
+    def uncache_user(self, df_user: dict):
+        """ Remove a DF user from the user cache """
+        discord_user = self.bot.get_user(df_user['discord_id'])
+        if discord_user:
+            self.df_users_cache.pop(discord_user, None)
 
     @tasks.loop(minutes=1)
     async def notifier(self):
-        if isinstance(self.df_users_cache, dict):  # If the cache has been initialized
-            notification_channel: discord.guild.GuildChannel = self.bot.get_channel(DF_CHANNEL_ID)
+        try:  # An exception escaping a `tasks.loop` stops it for good
+            async with self.notifier_lock:
+                await self.notify_cycle()
+        except Exception as e:
+            logger.error(ansi_color(f'Error running notifier cycle: {e}', 'red'))
+
+    def on_pushed_dialogue(self, user_ids: list[str]):
+        """ Called by the push receiver when DF users have new dialogue: make them due for polling, and wake the notifier """
+        for user_id in user_ids:
+            notification_poll_schedule.poll_soon(user_id)
+        self.push_wakeup.set()
+
+    async def run_pushed_cycles(self):
+        """ Run a notifier cycle whenever dialogue events are pushed """
+        while True:
+            await self.push_wakeup.wait()
+            await asyncio.sleep(PUSH_BATCH_DELAY.total_seconds())
+            self.push_wakeup.clear()  # Events pushed during the cycle wake it again afterwards
+            try:
+                async with self.notifier_lock:
+                    await self.notify_cycle()
+            except Exception as e:
+                logger.error(ansi_color(f'Error running notifier cycle for pushed events: {e}', 'red'))
 
-            for discord_user, df_user in self.df_users_cache.items():
-                if not discord_user:
-                    continue
-                if isinstance(discord_user, str):
-                    logger.error(ansi_color(f'Discord user for DF user {df_user['username']} (DF ID: {df_user['user_id']}) is a string: {discord_user}. Cannot fetch notifications (also, what the hell?)', 'red'))
+    async def notify_cycle(self):
+        """ Poll due users for unseen dialogue, and send everything waiting in the outbox """
+        if not isinstance(self.df_users_cache, dict):  # If the cache hasn't been initialized
+            return
 
-                    # self.update_user_cache.
+        notification_channel: discord.guild.GuildChannel = self.bot.get_channel(DF_CHANNEL_ID)
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        deadline = started_at + NOTIFIER_CYCLE_DEADLINE.total_seconds()
+
+        # Users the last cycle didn't get to go first, so nobody is starved when a cycle can't get through everyone
+        carried_over = [discord_user for discord_user in self.notifier_carry_over if discord_user in self.df_users_cache]
+        carried_over_set = set(carried_over)
+        notifiable_users = [
+            (discord_user, df_user)
+            for discord_user in carried_over + [u for u in list(self.df_users_cache) if u not in carried_over_set]
+            if (df_user := self.df_users_cache.get(discord_user)) and self.receives_notifications(discord_user, df_user)
+        ]
+
+        # Only poll users who are due, going by when their convoys arrive; everyone else is polled at a slower interval
+        polled_at = datetime.now(timezone.utc)
+        due_users = [
+            (discord_user, df_user)
+            for discord_user, df_user in notifiable_users
+            if notification_poll_schedule.is_due(df_user, polled_at)
+        ]
+
+        unseen_dialogue = {}
+        if due_users:
+            try:  # Fetch unseen dialogue for every due DF user at once, rather than a request each
+                unseen_dialogue = await api_calls.get_unseen_dialogue_for_users([df_user['user_id'] for _, df_user in due_users])
+            except Exception as e:  # Everyone stays due for the next cycle; whatever the outbox holds is still sent
+                logger.error(ansi_color(f'Error fetching notifications: {e}', 'red'))
+
+        fetched_notifications = []
+        fetched_users = []  # Users whose unseen dialogue was fetched, and is all in `fetched_notifications`
+        for discord_user, df_user in due_users:
+            unseen_dialogue_dicts = unseen_dialogue.get(str(df_user['user_id']))
+            if isinstance(unseen_dialogue_dicts, RuntimeError):
+                logger.error(ansi_color(f'Error fetching notifications for user {discord_user.name} (DF ID: {df_user['user_id']}): {unseen_dialogue_dicts}', 'red'))
+                continue
+            if str(df_user['user_id']) not in unseen_dialogue:
+                continue
+            try:
+                user_notifications = [
+                    {
+                        'message_key': outbox.message_key(dialogue, message),
+                        'user_id': df_user['user_id'],
+                        'content': message['content'].strip(),
+                        'metadata': {'char_b_id': dialogue.get('char_b_id')}
+                    }
+                    for dialogue in unseen_dialogue_dicts or []  # Almost everyone has nothing new
+                    for message in dialogue['messages']
+                ]
+            except Exception as e:  # Skip this user's malformed dialogue, leaving them due to retry next cycle
+                logger.error(ansi_color(f'Error reading notifications for user {discord_user.name} (DF ID: {df_user['user_id']}): {e}', 'red'))
+                continue
+            fetched_notifications.extend(user_notifications)
+            fetched_users.append(df_user)
 
-                    continue
+        try:
+            # Messages which were already sent (but not yet marked as seen, e.g. before a restart) are ignored here
+            new_notification_count = await self.notification_outbox.add(fetched_notifications)
+            outbox_pending = await self.notification_outbox.pending()  # Includes anything left unsent by an earlier cycle
+        except Exception as e:  # Fetched users stay due, so nothing is lost; it's all fetched again next cycle
+            logger.error(ansi_color(f'Error reading or writing the notification outbox: {e}', 'red'))
+            return
 
-                logger.info(ansi_color(f'Fetching notifications for user {discord_user.name} (Discord ID: {discord_user.id}) (DF ID: {df_user['user_id']})', 'blue'))
+        fetched_user_ids = set()
+        for df_user in fetched_users:
+            notification_poll_schedule.polled(df_user, polled_at)
+            fetched_user_ids.add(str(df_user['user_id']))
 
-                notification_type = df_user['metadata']['notifications']
-                
-                if notification_type not in [SERVER_NOTIFICATION_VALUE, DM_NOTIFICATION_VALUE]:
-                    logger.info('User has Discord ID, but does not receive either server or DM notifications')
+        pending = deque(
+            (discord_user, df_user, outbox_pending[str(df_user['user_id'])])
+            for discord_user, df_user in notifiable_users
+            if str(df_user['user_id']) in outbox_pending
+        )
+        logger.info(ansi_color(
+            f'Polled {len(due_users)} of {len(notifiable_users)} users and got {new_notification_count} new notifications; '
+            f'{len(pending)} users have notifications to send',
+            'cyan'
+        ))
+
+        notified_user_ids = []
+
+        async def worker():
+            while pending and loop.time() < deadline:  # Users in progress at the deadline are finished, not abandoned
+                discord_user, df_user, notifications = pending.popleft()
+                if not await self.notify_user(discord_user, df_user, notifications, notification_channel):
                     continue
+                notified_user_ids.append(df_user['user_id'])
+                try:
+                    await self.notification_outbox.mark_sent([notification['message_key'] for notification in notifications])
+                except Exception as e:  # Left pending, so they'll be sent again; better than never marking them seen
+                    logger.error(ansi_color(f'Error recording sent notifications for DF user {df_user['user_id']}: {e}', 'red'))
+
+        await asyncio.gather(*(worker() for _ in range(NOTIFIER_CONCURRENCY)))
+
+        # Mark dialogue as seen only for users fetched this cycle, and only once everything fetched for them has been
+        # sent (including sends from earlier cycles whose marking failed)
+        try:
+            users_to_mark_seen = await self.notification_outbox.users_to_mark_seen(fetched_user_ids)
+        except Exception as e:
+            logger.error(ansi_color(f'Error reading the notification outbox: {e}', 'red'))
+            users_to_mark_seen = []
+        if users_to_mark_seen:
+            try:
+                seen_results = await api_calls.mark_dialogue_as_seen_for_users(users_to_mark_seen)
+                for user_id, result in seen_results.items():
+                    if isinstance(result, RuntimeError):
+                        logger.error(ansi_color(f'Error marking dialogue as seen for DF user {user_id}: {result}', 'red'))
+                await self.notification_outbox.mark_seen([
+                    user_id for user_id, result in seen_results.items() if not isinstance(result, RuntimeError)
+                ])
+            except Exception as e:
+                logger.error(ansi_color(f'Error marking dialogue as seen: {e}', 'red'))
+
+        try:
+            await self.notification_outbox.prune()
+        except Exception as e:
+            logger.error(ansi_color(f'Error pruning the notification outbox: {e}', 'red'))
+
+        self.notifier_carry_over = [discord_user for discord_user, _, _ in pending]
+        self.notifier_last_duration = timedelta(seconds=loop.time() - started_at)
+        if self.notifier_carry_over:
+            logger.warning(ansi_color(
+                f'Notifier cycle hit its deadline after notifying {len(notified_user_ids)} users in {self.notifier_last_duration.total_seconds():.1f}s; '
+                f'carrying {len(self.notifier_carry_over)} users over to the next cycle',
+                'yellow'
+            ))
+        else:
+            logger.info(ansi_color(f'Notifier cycle notified {len(notified_user_ids)} users in {self.notifier_last_duration.total_seconds():.1f}s', 'cyan'))
 
-                try:  # Fetch unseen dialogue for the DF user
-                    unseen_dialogue_dicts = await api_calls.get_unseen_dialogue_for_user(user_id=df_user['user_id'])
-                    logger.info(ansi_color(f'Got {len(unseen_dialogue_dicts)} unseen dialogues', 'cyan'))
+        queue_depths = self.message_scheduler.queue_depths()
+        if queue_depths:  # Anything still queued is waiting on its destination's rate limit
+            logger.info(ansi_color(f'Outbound message queue depths: {queue_depths}', 'cyan'))
 
-                    seen_this_round = set()  # Ephemeral deduplication per user per run
+    def receives_notifications(self, discord_user: discord.User, df_user: dict) -> bool:
+        """ Whether a cached user can and wants to be sent notifications """
+        if not discord_user:
+            return False
+        if isinstance(discord_user, str):
+            logger.error(ansi_color(f'Discord user for DF user {df_user['username']} (DF ID: {df_user['user_id']}) is a string: {discord_user}. Cannot fetch notifications (also, what the hell?)', 'red'))
 
-                    if unseen_dialogue_dicts:
-                        notifications = []
-                        for dialogue in unseen_dialogue_dicts:
-                            for message in dialogue['messages']:
-                                content = message['content'].strip()
+            # self.update_user_cache.
 
-                                if not content or content in seen_this_round:
-                                    logger.error(ansi_color('Got duplicate notification, skipping…', 'red'))
-                                    continue
+            return False
 
-                                seen_this_round.add(content)
-                                notifications.append({
-                                    'message_content': content,
-                                    'message_metadata': dialogue
-                                })
+        if df_user['metadata']['notifications'] not in [SERVER_NOTIFICATION_VALUE, DM_NOTIFICATION_VALUE]:
+            logger.info(f'User {discord_user.name} has Discord ID, but does not receive either server or DM notifications')
+            return False
 
-                        embeds_to_send = []
-                        for notification in notifications:
-                            # embed = discord.Embed(description=notification[:4096])  # Embed descriptions can be a maximum of 4096 chars
-                            embed = discord.Embed(description=notification['message_content'][:4096])  # Embed descriptions can be a maximum of 4096 chars
-                            embed.set_author(
-                                name=discord_user.display_name,
-                                icon_url=discord_user.avatar.url
-                            )
+        return True
 
-                            user_convoy_id = notification['message_metadata']['char_b_id']
+    async def notify_user(
+            self,
+            discord_user: discord.User,
+            df_user: dict,
+            notifications: list[dict],
+            notification_channel: discord.guild.GuildChannel
+    ) -> bool:
+        """ Send a user their notifications from the outbox. Returns whether they were sent. """
+        notification_type = df_user['metadata']['notifications']
 
-                            # XXX: use (currently nonexistent) messsage metadata to decide what sort of button to attach to the notification (Respond to encounter, Go to convoy, etc)
-                            # view = RespondToConvoyView(user_discord_id=discord_user_id, user_convoy_id=user_convoy_id, user_cache=self.df_users_cache)
+        try:
+            seen_this_round = set()  # Ephemeral deduplication per user per run
 
-                            # await notification_channel.send(embed=embed, view=view)
+            embeds_to_send = []
+            for notification in notifications:
+                content = notification['content']
 
-                            embeds_to_send.append(embed)
+                if not content or content in seen_this_round:
+                    logger.error(ansi_color('Got duplicate notification, skipping…', 'red'))
+                    continue
 
-                        if notification_type == SERVER_NOTIFICATION_VALUE:
-                            notification_log = 'User receives server notification'
-                            ping = f'<@{discord_user.id}>'
-                            await notification_channel.send(content=ping, embeds=embeds_to_send)
+                seen_this_round.add(content)
+                embed = discord.Embed(description=content[:4096])  # Embed descriptions can be a maximum of 4096 chars
+                embed.set_author(
+                    name=discord_user.display_name,
+                    icon_url=discord_user.avatar.url
+                )
 
-                        elif notification_type == DM_NOTIFICATION_VALUE:
-                            notification_log = 'User receives DM notification'
-                            await discord_user.send(embeds=embeds_to_send)
+                user_convoy_id = notification['metadata']['char_b_id']
 
-                        logger.info(notification_log)
-                        logger.info(ansi_color(f'Sent {len(notifications)} notification(s) to user {discord_user.display_name} ({discord_user.id})', 'green'))
+                # XXX: use (currently nonexistent) messsage metadata to decide what sort of button to attach to the notification (Respond to encounter, Go to convoy, etc)
+                # view = RespondToConvoyView(user_discord_id=discord_user_id, user_convoy_id=user_convoy_id, user_cache=self.df_users_cache)
 
-                        # Mark dialogue as seen after sending notification
-                        await api_calls.mark_dialogue_as_seen(user_id=df_user['user_id'])
+                # await notification_channel.send(embed=embed, view=view)
 
-                except Exception as e:
-                    logger.error(ansi_color(f'Error fetching notifications: {e}', 'red'))
-                    continue
+                embeds_to_send.append(embed)
+
+            if not embeds_to_send:  # Only empty or duplicate messages; nothing to send, but they're dealt with
+                return True
+
+            if notification_type == SERVER_NOTIFICATION_VALUE:
+                notification_log = 'User receives server notification'
+                ping = f'<@{discord_user.id}>'
+                await self.message_scheduler.send(notification_channel, content=ping, embeds=embeds_to_send, mergeable=True)
+
+            elif notification_type == DM_NOTIFICATION_VALUE:
+                notification_log = 'User receives DM notification'
+                await self.message_scheduler.send(discord_user, embeds=embeds_to_send)
+
+            logger.info(notification_log)
+            logger.info(ansi_color(f'Sent {len(embeds_to_send)} notification(s) to user {discord_user.display_name} ({discord_user.id})', 'green'))
+            return True
+
+        except Exception as e:
+            logger.error(ansi_color(f'Error sending notifications: {e}', 'red'))
+            return False
+
+    @tasks.loop(minutes=MAP_REFRESH_MINUTES)
+    async def refresh_map(self):
+        try:
+            if self.map_from_snapshot:  # Booted from a snapshot; replace it with the whole live map
+                new_map = await api_calls.get_map()
+            elif self.refresh_map.current_loop == 0:
+                return  # The map was just loaded by `on_ready`
+            else:
+                new_map = await map_cache.refresh_map_regions(self.df_map_obj)
+        except Exception as e:
+            logger.error(ansi_color(f'Error refreshing map, keeping the current one: {e}', 'red'))
+            return
+
+        self.set_map(new_map)
+        logger.info(ansi_color(f'Refreshed map ({len(self.settlements_cache)} settlements)', 'green'))
+        await snapshot.save_map(new_map)
+
+    @tasks.loop(seconds=reference_data.REFERENCE_DATA_TTL.total_seconds())
+    async def refresh_reference_data(self):
+        await reference_data.refresh_all()
 
     @tasks.loop(time=time(hour=10, minute=0, tzinfo=MOUNTAIN_TIME))  # 10AM Mountain Time
     async def post_leaderboards(self):
@@ -387,7 +725,7 @@ class DesolateCog(commands.Cog):
 
         leaderboard_channel: discord.guild.GuildChannel = self.bot.get_channel(DF_LEADERBOARD_CHANNEL_ID)
         if leaderboard_channel:
-            await leaderboard_channel.send(embeds=[civic_embed, syndicate_embed])
+            await self.message_scheduler.send(leaderboard_channel, embeds=[civic_embed, syndicate_embed])
             logger.info(ansi_color(f'Posted Top {top_n_display} leaderboards', 'green'))
         else:
             logger.error(ansi_color(f'Notification channel {DF_LEADERBOARD_CHANNEL_ID} not found for leaderboards.', 'red'))
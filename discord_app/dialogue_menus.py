@@ -186,10 +186,15 @@ class RespondToConvoyView(discord.ui.View):
         self.df_state.interaction = interaction
 
         self.df_state.user_obj = await api_calls.get_user_by_discord(self.user_discord_id)
-        self.df_state.convoy_obj = await api_calls.get_convoy(
-            convoy_id=self.user_convoy_id,
-            user_id=self.df_state.user_obj['user_id']
-        )
+        self.df_state.convoy_obj = next((  # The user was just fetched, so their convoys are fresh
+            c for c in self.df_state.user_obj['convoys']
+            if c['convoy_id'] == self.user_convoy_id
+        ), None)
+        if self.df_state.convoy_obj is None:
+            self.df_state.convoy_obj = await api_calls.get_convoy(
+                convoy_id=self.user_convoy_id,
+                user_id=self.df_state.user_obj['user_id']
+            )
         self.df_state.map_obj = await api_calls.get_map()
         self.df_state.user_cache = self.user_cache
 
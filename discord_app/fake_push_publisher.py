@@ -0,0 +1,69 @@
+# SPDX-FileCopyrightText: 2024-present Oori Data <info@oori.dev>
+# SPDX-License-Identifier: UNLICENSED
+"""
+Stand-in for the DF API, pushing "new dialogue" events at a locally running bot's push receiver.
+
+Run it as a script (not with `-m`), so it doesn't need the bot's environment:
+    python discord_app/fake_push_publisher.py <df_user_id> [<df_user_id> …]
+    python discord_app/fake_push_publisher.py --ws --repeat 5 --interval 2 <df_user_id>
+"""
+import                                os
+import                                json
+import                                asyncio
+import                                argparse
+
+import                                httpx
+import                                aiohttp
+
+DEFAULT_RECEIVER_URL = f'http://127.0.0.1:{os.environ.get('DF_PUSH_RECEIVER_PORT', '8765')}'
+
+
+def _headers(token: str | None) -> dict:
+    return {'Authorization': f'Bearer {token}'} if token else {}
+
+
+async def publish_over_http(receiver_url: str, user_ids: list[str], token: str | None = None) -> dict:
+    """ POST a single "new dialogue" event """
+    async with httpx.AsyncClient() as client:
+        response = await client.post(
+            url=f'{receiver_url}/events/dialogue',
+            headers=_headers(token),
+            json={'user_ids': user_ids}
+        )
+    response.raise_for_status()
+    return response.json()
+
+
+async def publish_over_ws(receiver_url: str, events: list[list[str]], interval: float = 0, token: str | None = None):
+    """ Send "new dialogue" events over one WebSocket connection, `interval` seconds apart """
+    async with aiohttp.ClientSession() as session:
+        async with session.ws_connect(f'{receiver_url}/events/ws', headers=_headers(token)) as ws:
+            for i, user_ids in enumerate(events):
+                if i and interval:
+                    await asyncio.sleep(interval)
+                await ws.send_str(json.dumps({'user_ids': user_ids}))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='Push fake "new dialogue" events to the DF Discord push receiver')
+    parser.add_argument('user_ids', nargs='+', help='DF user IDs with new dialogue')
+    parser.add_argument('--url', default=DEFAULT_RECEIVER_URL, help='Push receiver base URL')
+    parser.add_argument('--token', default=os.environ.get('DF_PUSH_RECEIVER_TOKEN'), help='Push receiver bearer token')
+    parser.add_argument('--ws', action='store_true', help='Publish over a WebSocket rather than HTTP POSTs')
+    parser.add_argument('--repeat', type=int, default=1, help='How many times to publish the event')
+    parser.add_argument('--interval', type=float, default=0, help='Seconds between repeats')
+    args = parser.parse_args()
+
+    if args.ws:
+        await publish_over_ws(args.url, [args.user_ids] * args.repeat, args.interval, args.token)
+        print(f'Sent {args.repeat} event(s) over WebSocket')
+        return
+
+    for i in range(args.repeat):
+        if i and args.interval:
+            await asyncio.sleep(args.interval)
+        print(await publish_over_http(args.url, args.user_ids, args.token))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
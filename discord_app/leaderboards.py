@@ -0,0 +1,36 @@
+# SPDX-FileCopyrightText: 2024-present Oori Data <info@oori.dev>
+# SPDX-License-Identifier: UNLICENSED
+
+
+class RankedLeaderboard:
+    """
+    A leaderboard put in rank order once, so top-N and "around me" windows are slices rather than sorts.
+    Cached leaderboards are shared between everyone reading them, so treat `data` as read-only.
+    """
+    def __init__(self, leaderboard_data: dict | None):
+        self.data = leaderboard_data or {}
+        self.ranked_ids: list[str] = sorted(
+            (entry_id for entry_id, entry in self.data.items() if 'leaderboard_position' in entry),
+            key=lambda entry_id: self.data[entry_id]['leaderboard_position']
+        )
+        self.rank_index: dict[str, int] = {entry_id: i for i, entry_id in enumerate(self.ranked_ids)}
+
+    def position(self, entry_id: str) -> int | None:
+        return self.data[entry_id]['leaderboard_position'] if entry_id in self.rank_index else None
+
+    def top(self, n: int) -> list[str]:
+        return self.ranked_ids[:n]
+
+    def top_positions(self, max_position: int) -> list[str]:
+        """ The entries placed at or above `max_position` """
+        ids = []
+        for entry_id in self.ranked_ids:
+            if self.data[entry_id]['leaderboard_position'] > max_position:
+                break
+            ids.append(entry_id)
+        return ids
+
+    def around(self, entry_id: str, radius: int = 1) -> list[str]:
+        """ `entry_id` and the `radius` entries either side of it """
+        i = self.rank_index[entry_id]
+        return self.ranked_ids[max(i - radius, 0):i + radius + 1]
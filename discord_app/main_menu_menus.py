@@ -9,10 +9,10 @@ import                                discord
 
 import                                discord_app
 from discord_app               import (
-    api_calls, convoy_menus, warehouse_menus, banner_menus,
-    handle_timeout, add_external_URL_buttons, discord_timestamp, df_embed_author, get_image_as_discord_file,
+    api_calls, map_cache, reference_data, convoy_menus, warehouse_menus, banner_menus,
+    handle_timeout, add_external_URL_buttons, discord_timestamp, df_embed_author, set_embed_image,
     DF_GUILD_ID, DF_TEXT_LOGO_URL, DF_LOGO_EMOJI, OORI_RED, SERVER_NOTIFICATION_VALUE, DM_NOTIFICATION_VALUE,
-    get_user_metadata, validate_interaction,
+    get_user_metadata, validate_interaction, gather_bounded,
     get_settlement_emoji, get_vehicle_emoji
 )
 import discord_app.convoy_menus
@@ -25,6 +25,7 @@ API_UNPROCESSABLE_ENTITY_CODE = 422
 LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
 DF_API_HOST = os.environ.get('DF_API_HOST')
 DISCORD_TOKEN = os.environ.get('DISCORD_TOKEN')
+MAIN_MENU_TILE_CONCURRENCY = int(os.environ.get('DF_MAIN_MENU_TILE_CONCURRENCY', '4'))
 
 
 async def main_menu(
@@ -36,10 +37,9 @@ async def main_menu(
         edit: bool=True
 ):
     # This menu should *always* perform a "full refresh" in order to allow it to function as a reset/refresh button
-    df_logo = await get_image_as_discord_file(DF_TEXT_LOGO_URL)
     title_embed = discord.Embed()
     title_embed.color = discord.Color.from_rgb(*OORI_RED)
-    title_embed.set_image(url='attachment://image.png')
+    title_files = await set_embed_image(title_embed, DF_TEXT_LOGO_URL)
 
     if not discord_user_id:
         discord_user_id = interaction.user.id
@@ -53,32 +53,55 @@ async def main_menu(
         # print(f'user not registered: {e}')
         user_obj = None
 
+    if not df_map:  # Get the map, if none was provided; before the tile lookups, so they can be served from it
+        df_map = await api_calls.get_map()
+
     if user_obj:
         if user_obj['convoys']:  # If the user has convoys
             convoy_descs = []
             sorted_convoys = sorted(user_obj['convoys'], key=lambda x: x['name'], reverse=True)
+
+            # Look up every tile the summaries need at once, fetching each coordinate only once
+            coords = list(dict.fromkeys(
+                coord
+                for convoy in sorted_convoys
+                for coord in [
+                    (convoy['x'], convoy['y']),
+                    *([(convoy['journey']['dest_x'], convoy['journey']['dest_y'])] if convoy['journey'] else [])
+                ]
+            ))
+            fetched_tiles = await gather_bounded(
+                *(map_cache.get_tile(map_obj=df_map, x=x, y=y) for x, y in coords),
+                limit=MAIN_MENU_TILE_CONCURRENCY,
+                return_exceptions=True  # A tile which can't be fetched only degrades its own convoy's summary
+            )
+            tiles = {
+                coord: None if isinstance(tile, Exception) else tile
+                for coord, tile in zip(coords, fetched_tiles)
+            }
+
             for convoy in sorted_convoys:
-                tile_obj = await api_calls.get_tile(
-                    x=convoy['x'],
-                    y=convoy['y']
-                )
+                tile_obj = tiles[(convoy['x'], convoy['y'])]
 
                 if convoy['journey']:
-                    destination = await api_calls.get_tile(
-                        x=convoy['journey']['dest_x'],
-                        y=convoy['journey']['dest_y']
+                    dest_x, dest_y = convoy['journey']['dest_x'], convoy['journey']['dest_y']
+                    destination = tiles[(dest_x, dest_y)]
+                    destination_name = (
+                        destination['settlements'][0]['name']
+                        if destination and destination['settlements']
+                        else f'({dest_x}, {dest_y})'
                     )
                     progress_percent = ((convoy['journey']['progress']) / len(convoy['journey']['route_x'])) * 100
                     eta = convoy['journey']['eta']
                     convoy_descs.extend([
                         f'## {convoy['name']} 🛣️\n'
-                        f'In transit to **{destination['settlements'][0]['name']}**: **{progress_percent:.1f}%** (ETA: {discord_timestamp(eta, 'f')})',
+                        f'In transit to **{destination_name}**: **{progress_percent:.1f}%** (ETA: {discord_timestamp(eta, 'f')})',
                         '\n'.join([f'- {vehicle['name']} {get_vehicle_emoji(vehicle['shape'])}' for vehicle in convoy['vehicles']])
                     ])
                 else:
                     convoy_descs.extend([
                         f'## {convoy['name']} 🅿️\n'
-                        f'Arrived at **{tile_obj['settlements'][0]['name']}**' if tile_obj['settlements'] else f'Arrived at **({convoy['x']}, {convoy['y']})**',
+                        f'Arrived at **{tile_obj['settlements'][0]['name']}**' if tile_obj and tile_obj['settlements'] else f'Arrived at **({convoy['x']}, {convoy['y']})**',
                         '\n'.join([f'- {vehicle['name']} {get_vehicle_emoji(vehicle['shape'])}' for vehicle in convoy['vehicles']])
                     ])
 
@@ -114,16 +137,13 @@ async def main_menu(
         ])
         user_obj = None
 
-    if not df_map:  # Get the map, if none was provided
-        df_map = await api_calls.get_map()
-
     df_state = DFState(  # Prepare the DFState object
         user_discord_id=discord_user_id,
         map_obj=df_map,
         user_obj=user_obj,
         interaction=interaction,
         user_cache=user_cache,
-        misc={'resource_weights': await api_calls.resource_weights()}  # XXX: Cache this and move to df_discord.py or smth
+        misc={'resource_weights': await reference_data.resource_weights.get()}
     )
 
     main_menu_embed = discord.Embed()
@@ -139,7 +159,7 @@ async def main_menu(
             content=None,
             embeds=embeds,
             view=main_menu_view,
-            attachments=[df_logo]
+            attachments=title_files
         )
 
     elif edit:
@@ -151,7 +171,7 @@ async def main_menu(
             content=None,
             embeds=embeds,
             view=main_menu_view,
-            attachments=[df_logo]
+            attachments=title_files
         )
 
     else:
@@ -161,7 +181,7 @@ async def main_menu(
             content=None,
             embeds=[title_embed, main_menu_embed],
             view=main_menu_view,
-            files=[df_logo]
+            files=title_files
         )
 
 class MainMenuView(discord.ui.View):
@@ -352,17 +372,9 @@ class MainMenuWarehouseSelect(discord.ui.Select):
         placeholder = 'Warehouses'
         disabled = False
         options=[]
+        settlements_by_id = map_cache.map_index(self.df_state.map_obj).settlements_by_id
         for warehouse in self.df_state.user_obj['warehouses']:
-            warehouse_sett = next(
-                (
-                    s
-                    for row in self.df_state.map_obj['tiles']
-                    for t in row
-                    for s in t['settlements']
-                    if s['sett_id'] == warehouse['sett_id']
-                ),
-                None
-            )
+            warehouse_sett = settlements_by_id.get(warehouse['sett_id'])
 
             if warehouse_sett:  # Ensure the settlement exists
                 options.append(discord.SelectOption(
@@ -394,13 +406,9 @@ class MainMenuWarehouseSelect(discord.ui.Select):
             warehouse_id=self.values[0],
             user_id=self.df_state.user_obj['user_id']
         )
-        self.df_state.sett_obj = next((
-            s
-            for row in self.df_state.map_obj['tiles']
-            for t in row
-            for s in t['settlements']
-            if s['sett_id'] == self.df_state.warehouse_obj['sett_id']
-        ), None)
+        self.df_state.sett_obj = map_cache.map_index(self.df_state.map_obj).settlements_by_id.get(
+            self.df_state.warehouse_obj['sett_id']
+        )
 
         await warehouse_menus.warehouse_menu(self.df_state)
 
@@ -458,10 +466,19 @@ class MainMenuConvoySelect(discord.ui.Select):
             return
         self.df_state.interaction = interaction
 
-        self.df_state.convoy_obj = next((
+        self.df_state.convoy_obj = next((  # The user was just fetched for this menu, so their convoys are fresh
             c for c in self.df_state.user_obj['convoys']
             if c['convoy_id'] == self.values[0]
         ), None)
+        if self.df_state.convoy_obj is None:  # Only if the menu's user object has gone stale
+            try:
+                self.df_state.convoy_obj = await api_calls.get_convoy(
+                    convoy_id=self.values[0],
+                    user_id=self.df_state.user_obj['user_id']
+                )
+            except RuntimeError as e:
+                await interaction.response.send_message(content=e, ephemeral=True)
+                return
 
         tile_obj = await api_calls.get_tile(
             x=self.df_state.convoy_obj['x'],
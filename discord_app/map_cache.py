@@ -0,0 +1,127 @@
+# SPDX-FileCopyrightText: 2024-present Oori Data <info@oori.dev>
+# SPDX-License-Identifier: UNLICENSED
+import                                os
+import                                asyncio
+from collections               import OrderedDict
+from uuid                      import UUID
+
+from discord_app               import api_calls
+
+# Tile fields which may be served from the in-memory map rather than fetched from the API.
+# `vendors` stands in for the vendors (and their inventories) of a tile's settlements; they change constantly, so they
+# are left out by default and any lookup which needs them goes to the API.
+CACHEABLE_TILE_FIELDS = frozenset(os.environ.get(
+    'DF_CACHEABLE_TILE_FIELDS',
+    'terrain_difficulty,region,settlements'
+).split(','))
+
+# Only regions containing settlements change between map loads (vendors restock, prices move); terrain never does
+MAP_REFRESH_REGION_SIZE = int(os.environ.get('DF_MAP_REFRESH_REGION_SIZE', '16'))  # Width/height of a refresh region, in tiles
+MAP_REFRESH_CONCURRENCY = int(os.environ.get('DF_MAP_REFRESH_CONCURRENCY', '4'))
+
+MAX_INDEXED_MAPS = 4  # Only the current map (and any stragglers still referenced by open menus) need an index
+
+
+class MapIndex:
+    """ Lookup tables over a map's tiles, built once per map load. """
+    def __init__(self, map_obj: dict):
+        self.settlements: list[dict] = []
+        self.settlements_by_id: dict[str, dict] = {}
+        self.settlements_by_vendor_id: dict[str, dict] = {}
+        self.vendors_by_id: dict[str, dict] = {}
+        self.tiles_by_coords: dict[tuple[int, int], dict] = {}
+
+        for y, row in enumerate(map_obj['tiles']):
+            for x, tile in enumerate(row):
+                self.tiles_by_coords[(x, y)] = tile
+                for sett in tile['settlements']:
+                    self.settlements.append(sett)
+                    self.settlements_by_id[sett['sett_id']] = sett
+                    for vendor in sett['vendors']:
+                        self.settlements_by_vendor_id[vendor['vendor_id']] = sett
+                        self.vendors_by_id[vendor['vendor_id']] = vendor
+
+
+_map_indexes: OrderedDict[int, tuple[dict, MapIndex]] = OrderedDict()
+
+
+def map_index(map_obj: dict) -> MapIndex:
+    """ Get the `MapIndex` for `map_obj`, building it the first time that map is seen. """
+    key = id(map_obj)
+    entry = _map_indexes.get(key)
+    if entry is not None and entry[0] is map_obj:  # Holding a reference to the map keeps its `id()` from being reused
+        _map_indexes.move_to_end(key)
+        return entry[1]
+
+    index = MapIndex(map_obj)
+    _map_indexes[key] = (map_obj, index)
+    while len(_map_indexes) > MAX_INDEXED_MAPS:
+        _map_indexes.popitem(last=False)
+    return index
+
+
+def local_tile(map_obj: dict | None, x: int, y: int) -> dict | None:
+    """ Get the tile at (`x`, `y`) from `map_obj`, or `None` if it isn't in there. """
+    if not map_obj:
+        return None
+    return map_index(map_obj).tiles_by_coords.get((x, y))
+
+
+async def get_tile(
+        map_obj: dict | None,
+        x: int,
+        y: int,
+        fields: tuple[str, ...] = ('settlements',),
+        user_id: UUID | None = None
+) -> dict:
+    """ Get the tile at (`x`, `y`), from `map_obj` if all of the `fields` the caller needs may be cached. """
+    if CACHEABLE_TILE_FIELDS.issuperset(fields):
+        tile = local_tile(map_obj, x, y)
+        if tile is not None:
+            return tile
+
+    return await api_calls.get_tile(x=x, y=y, user_id=user_id)
+
+
+def settlement_regions(map_obj: dict, region_size: int = MAP_REFRESH_REGION_SIZE) -> list[dict]:
+    """ Split the map into `region_size` squares and get the bounds of those which contain settlements. """
+    tiles = map_obj['tiles']
+    height = len(tiles)
+    width = len(tiles[0]) if tiles else 0
+
+    region_origins = sorted({
+        (sett['x'] // region_size * region_size, sett['y'] // region_size * region_size)
+        for sett in map_index(map_obj).settlements
+    })
+    return [
+        {
+            'x_min': x,
+            'x_max': min(x + region_size, width) - 1,
+            'y_min': y,
+            'y_max': min(y + region_size, height) - 1
+        }
+        for x, y in region_origins
+    ]
+
+
+async def refresh_map_regions(map_obj: dict, regions: list[dict] | None = None) -> dict:
+    """ Re-fetch `regions` of `map_obj` (by default, every region with settlements in it) and get a new map with them
+    spliced in. `map_obj` itself is left untouched, so the caller can swap the new map in atomically. """
+    if regions is None:
+        regions = settlement_regions(map_obj)
+
+    semaphore = asyncio.Semaphore(MAP_REFRESH_CONCURRENCY)
+
+    async def fetch_region(bounds: dict) -> tuple[dict, dict]:
+        async with semaphore:
+            return bounds, await api_calls.get_map(**bounds)
+
+    fetched_regions = await asyncio.gather(*(fetch_region(bounds) for bounds in regions))
+
+    new_tiles = [list(row) for row in map_obj['tiles']]  # Copy the rows, share the untouched tiles
+    for bounds, region in fetched_regions:
+        for dy, row in enumerate(region['tiles']):
+            y = bounds['y_min'] + dy
+            new_tiles[y][bounds['x_min']:bounds['x_min'] + len(row)] = row
+
+    return {**map_obj, 'tiles': new_tiles}
@@ -0,0 +1,188 @@
+# SPDX-FileCopyrightText: 2024-present Oori Data <info@oori.dev>
+# SPDX-License-Identifier: UNLICENSED
+import                                os
+import                                time
+import                                asyncio
+import                                logging
+from collections               import deque, OrderedDict
+
+import                                discord
+
+from utiloori.ansi_color       import ansi_color
+
+# Discord allows roughly 5 messages per 5 seconds to a channel; stay under it rather than waiting out 429s
+DESTINATION_MESSAGES_PER_SECOND = float(os.environ.get('DF_DESTINATION_MESSAGES_PER_SECOND', '0.8'))
+DESTINATION_MESSAGE_BURST = int(os.environ.get('DF_DESTINATION_MESSAGE_BURST', '4'))
+MAX_TRACKED_DESTINATIONS = int(os.environ.get('DF_MAX_TRACKED_DESTINATIONS', '4096'))  # DMs make one destination per user
+
+DISCORD_MAX_EMBEDS = 10  # Per message
+DISCORD_MAX_CONTENT_LENGTH = 2000
+DISCORD_MAX_EMBED_CHARACTERS = 6000  # Across every embed's title, description, fields, footer and author in a message
+
+logger = logging.getLogger('DF_Discord')
+
+
+class TokenBucket:
+    """ Allows bursts of up to `capacity` sends, refilling at `rate` sends per second. """
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    async def take(self):
+        """ Wait for a token, then spend it. """
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class OutboundMessage:
+    """ A message waiting to be sent. `mergeable` messages may share a Discord message with their neighbours. """
+    def __init__(self, content: str | None, embeds: list[discord.Embed], mergeable: bool):
+        self.content = content
+        self.embeds = embeds
+        self.mergeable = mergeable
+        self.sent = asyncio.get_running_loop().create_future()
+
+
+class MessageScheduler:
+    """ Sends messages through one queue per destination, each paced by its own token bucket, so a busy channel
+    doesn't stall anyone else's sends. """
+    def __init__(self):
+        self._destinations: dict[tuple[str, int], discord.abc.Messageable] = {}
+        self._queues: dict[tuple[str, int], deque[OutboundMessage]] = {}
+        self._workers: dict[tuple[str, int], asyncio.Task] = {}
+        self._buckets: OrderedDict[tuple[str, int], TokenBucket] = OrderedDict()
+
+    @staticmethod
+    def _key(destination: discord.abc.Messageable) -> tuple[str, int]:
+        if isinstance(destination, (discord.User, discord.Member)):
+            return ('user', destination.id)
+        return ('channel', destination.id)
+
+    async def send(
+            self,
+            destination: discord.abc.Messageable,
+            content: str | None = None,
+            embeds: list[discord.Embed] | None = None,
+            mergeable: bool = False
+    ):
+        """ Queue a message for `destination`, and wait until it has been sent. Raises if sending it failed.
+        Embeds which won't fit in one Discord message are split across several, with `content` on the first. """
+        chunks = _chunk_embeds(embeds or []) or [[]]
+        messages = [
+            OutboundMessage(content if i == 0 else None, chunk, mergeable)
+            for i, chunk in enumerate(chunks)
+        ]
+
+        key = self._key(destination)
+        self._destinations[key] = destination
+        self._queues.setdefault(key, deque()).extend(messages)
+        if key not in self._workers:
+            self._workers[key] = asyncio.create_task(self._drain(key))
+
+        await asyncio.gather(*(message.sent for message in messages))
+
+    def queue_depths(self) -> dict[str, int]:
+        """ Messages waiting to be sent, per destination """
+        return {
+            f'{kind} {destination_id}': len(queue)
+            for (kind, destination_id), queue in self._queues.items()
+        }
+
+    def _bucket(self, key: tuple[str, int]) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(DESTINATION_MESSAGES_PER_SECOND, DESTINATION_MESSAGE_BURST)
+            self._buckets[key] = bucket
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > MAX_TRACKED_DESTINATIONS:
+            self._buckets.popitem(last=False)
+        return bucket
+
+    @staticmethod
+    def _take_batch(queue: deque[OutboundMessage]) -> list[OutboundMessage]:
+        """ Take the next message off `queue`, along with as many following mergeable messages as fit alongside it """
+        batch = [queue.popleft()]
+        if not batch[0].mergeable:
+            return batch
+
+        embed_count = len(batch[0].embeds)
+        embed_characters = sum(len(embed) for embed in batch[0].embeds)  # `len()` of an embed counts all of its text
+        content_length = len(batch[0].content or '')
+        while queue and queue[0].mergeable:
+            next_message = queue[0]
+            next_embed_characters = sum(len(embed) for embed in next_message.embeds)
+            if embed_count + len(next_message.embeds) > DISCORD_MAX_EMBEDS:
+                break
+            if embed_characters + next_embed_characters > DISCORD_MAX_EMBED_CHARACTERS:
+                break
+            if content_length + len(next_message.content or '') + 1 > DISCORD_MAX_CONTENT_LENGTH:
+                break
+            batch.append(queue.popleft())
+            embed_count += len(next_message.embeds)
+            embed_characters += next_embed_characters
+            content_length += len(next_message.content or '') + 1
+        return batch
+
+    async def _drain(self, key: tuple[str, int]):
+        destination = self._destinations[key]
+        queue = self._queues[key]
+        batch = []
+        try:
+            while queue:
+                await self._bucket(key).take()
+                batch = self._take_batch(queue)
+                contents = [message.content for message in batch if message.content]
+                try:
+                    await destination.send(
+                        content=' '.join(contents) if contents else None,
+                        embeds=[embed for message in batch for embed in message.embeds]
+                    )
+                except Exception as e:
+                    _resolve(batch, error=e)
+                else:
+                    _resolve(batch)
+        finally:  # Only leaves anything unresolved if cancelled; fail it rather than leave its senders waiting forever
+            _resolve([*batch, *queue], error=RuntimeError('Message scheduler shut down'))
+            del self._workers[key]
+            del self._queues[key]
+            del self._destinations[key]
+
+    async def close(self):
+        """ Stop every destination's worker """
+        workers = list(self._workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        logger.info(ansi_color('Closed outbound message scheduler', 'yellow'))
+
+
+def _chunk_embeds(embeds: list[discord.Embed]) -> list[list[discord.Embed]]:
+    """ Split `embeds` into runs which each fit in one message, by embed count and total embed characters """
+    chunks = []
+    chunk_characters = 0
+    for embed in embeds:
+        if not chunks or len(chunks[-1]) == DISCORD_MAX_EMBEDS or chunk_characters + len(embed) > DISCORD_MAX_EMBED_CHARACTERS:
+            chunks.append([])
+            chunk_characters = 0
+        chunks[-1].append(embed)
+        chunk_characters += len(embed)
+    return chunks
+
+
+def _resolve(messages: list[OutboundMessage], error: Exception | None = None):
+    """ Let the senders of `messages` know how their send went, unless they've already stopped waiting """
+    for message in messages:
+        if message.sent.done():
+            continue
+        if error is None:
+            message.sent.set_result(None)
+        else:
+            message.sent.set_exception(error)
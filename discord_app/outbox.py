@@ -0,0 +1,155 @@
+# SPDX-FileCopyrightText: 2024-present Oori Data <info@oori.dev>
+# SPDX-License-Identifier: UNLICENSED
+import                                os
+import                                json
+import                                time
+import                                asyncio
+import                                sqlite3
+import                                threading
+import                                hashlib
+import                                logging
+from datetime                  import timedelta
+from typing                    import Any, Callable
+
+from utiloori.ansi_color       import ansi_color
+
+from discord_app               import snapshot
+
+OUTBOX_PATH = os.environ.get('DF_OUTBOX_PATH', os.path.join(snapshot.SNAPSHOT_DIR, 'outbox.sqlite3'))
+# Delivered notifications are remembered this long, so the same message showing up as unseen again isn't re-sent
+OUTBOX_RETENTION = timedelta(days=int(os.environ.get('DF_OUTBOX_RETENTION_DAYS', '7')))
+
+PENDING = 'pending'  # Fetched, not yet sent to Discord
+SENT = 'sent'  # Sent to Discord, not yet marked as seen in the DF API
+SEEN = 'seen'  # Done; kept around until it ages out, to recognize it if it comes back
+
+logger = logging.getLogger('DF_Discord')
+
+
+def message_key(dialogue: dict, message: dict) -> str:
+    """ A stable identity for a dialogue message, whether or not the API gives it an ID """
+    if message.get('message_id'):
+        return str(message['message_id'])
+    identity = json.dumps([
+        dialogue.get('dialogue_id'), dialogue.get('char_a_id'), dialogue.get('char_b_id'),
+        message.get('timestamp'), message['content']
+    ], default=str)
+    return hashlib.sha256(identity.encode()).hexdigest()
+
+
+class NotificationOutbox:
+    """
+    A durable record of every notification from the moment it's fetched until it has been sent and marked as seen.
+    Anything fetched but not sent before a restart is sent afterwards, and nothing which was sent is sent again.
+    Queries run in a worker thread, one at a time, so waiting on the disk never blocks the event loop.
+    """
+    def __init__(self, path: str = OUTBOX_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)  # Only ever used by one thread at a time, under `_lock`
+        self._lock = threading.Lock()
+        self.db.row_factory = sqlite3.Row
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')  # A crash may lose the last few updates, never corrupt the file
+        with self.db:
+            self.db.execute('''
+                CREATE TABLE IF NOT EXISTS outbox (
+                    message_key TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            ''')
+            self.db.execute('CREATE INDEX IF NOT EXISTS outbox_state ON outbox (state, user_id)')
+
+    async def _run(self, query: Callable[..., Any], *args) -> Any:
+        def run_locked():
+            with self._lock:
+                return query(*args)
+        return await asyncio.to_thread(run_locked)
+
+    async def add(self, notifications: list[dict]) -> int:
+        """ Record newly fetched notifications (`message_key`, `user_id`, `content`, `metadata`), ignoring any which
+        are already in the outbox. Returns how many were new. """
+        return await self._run(self._add, notifications)
+
+    def _add(self, notifications: list[dict]) -> int:
+        now = time.time()
+        with self.db:
+            cursor = self.db.executemany(
+                'INSERT OR IGNORE INTO outbox (message_key, user_id, content, metadata, state, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [
+                    (
+                        n['message_key'], str(n['user_id']), n['content'], json.dumps(n['metadata'], default=str),
+                        PENDING, now
+                    )
+                    for n in notifications
+                ]
+            )
+        return cursor.rowcount
+
+    async def pending(self) -> dict[str, list[dict]]:
+        """ Notifications waiting to be sent, per DF user ID, oldest first """
+        return await self._run(self._pending)
+
+    def _pending(self) -> dict[str, list[dict]]:
+        pending_by_user = {}
+        for row in self.db.execute(
+            'SELECT message_key, user_id, content, metadata FROM outbox WHERE state = ? ORDER BY created_at, rowid',
+            (PENDING,)
+        ):
+            pending_by_user.setdefault(row['user_id'], []).append({
+                'message_key': row['message_key'],
+                'content': row['content'],
+                'metadata': json.loads(row['metadata'])
+            })
+        return pending_by_user
+
+    async def mark_sent(self, message_keys: list[str]):
+        await self._run(self._mark_sent, message_keys)
+
+    def _mark_sent(self, message_keys: list[str]):
+        with self.db:
+            self.db.executemany('UPDATE outbox SET state = ? WHERE message_key = ?', [(SENT, key) for key in message_keys])
+
+    async def users_to_mark_seen(self, fetched_user_ids: set[str]) -> list[str]:
+        """ Of the DF users whose unseen dialogue was just fetched, those with sent notifications and none still
+        waiting to be sent. Marking dialogue as seen covers all of a user's dialogue, so marking anyone else could
+        cover messages which arrived since they were last fetched, and which were never sent. """
+        return [user_id for user_id in await self._run(self._users_to_mark_seen) if user_id in fetched_user_ids]
+
+    def _users_to_mark_seen(self) -> list[str]:
+        return [
+            row['user_id']
+            for row in self.db.execute(
+                'SELECT DISTINCT user_id FROM outbox WHERE state = ? '
+                'AND user_id NOT IN (SELECT user_id FROM outbox WHERE state = ?)',
+                (SENT, PENDING)
+            )
+        ]
+
+    async def mark_seen(self, user_ids: list[str]):
+        await self._run(self._mark_seen, user_ids)
+
+    def _mark_seen(self, user_ids: list[str]):
+        with self.db:
+            self.db.executemany(
+                'UPDATE outbox SET state = ? WHERE state = ? AND user_id = ?',
+                [(SEEN, SENT, str(user_id)) for user_id in user_ids]
+            )
+
+    async def prune(self, retention: timedelta = OUTBOX_RETENTION):
+        """ Forget notifications older than `retention`, whatever state they're in """
+        await self._run(self._prune, retention)
+
+    def _prune(self, retention: timedelta):
+        with self.db:
+            cursor = self.db.execute('DELETE FROM outbox WHERE created_at < ?', (time.time() - retention.total_seconds(),))
+        if cursor.rowcount:
+            logger.info(ansi_color(f'Pruned {cursor.rowcount} old notifications from the outbox', 'cyan'))
+
+    def close(self):
+        with self._lock:
+            self.db.close()
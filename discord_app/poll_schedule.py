@@ -0,0 +1,80 @@
+# SPDX-FileCopyrightText: 2024-present Oori Data <info@oori.dev>
+# SPDX-License-Identifier: UNLICENSED
+import                                os
+import                                logging
+from datetime                  import datetime, timedelta, UTC
+from uuid                      import UUID
+
+from utiloori.ansi_color       import ansi_color
+
+# How often users are polled for notifications when nothing is expected to happen to them soon
+IDLE_POLL_INTERVAL = timedelta(minutes=int(os.environ.get('DF_IDLE_POLL_MINUTES', '15')))
+IN_TRANSIT_POLL_INTERVAL = timedelta(minutes=int(os.environ.get('DF_IN_TRANSIT_POLL_MINUTES', '5')))
+# Arrival dialogue is written just after a convoy's ETA; polling right on it would usually miss it
+ARRIVAL_POLL_GRACE = timedelta(seconds=int(os.environ.get('DF_ARRIVAL_POLL_GRACE_SECONDS', '15')))
+
+logger = logging.getLogger('DF_Discord')
+
+
+def journey_etas(df_user: dict) -> list[datetime]:
+    """ The ETAs of every one of a user's convoys which is in transit """
+    etas = []
+    for convoy in df_user.get('convoys') or []:
+        if not convoy.get('journey'):
+            continue
+        try:
+            eta = convoy['journey']['eta']
+            eta = eta if isinstance(eta, datetime) else datetime.fromisoformat(eta)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(ansi_color(f'Could not read the ETA of convoy {convoy.get('convoy_id')}: {e}', 'yellow'))
+            continue
+        etas.append(eta if eta.tzinfo else eta.replace(tzinfo=UTC))
+    return etas
+
+
+def next_poll_at(df_user: dict, now: datetime) -> datetime:
+    """ When a user polled at `now` should next be polled: just after their next convoy arrival, and otherwise at an
+    interval depending on whether any of their convoys are in transit """
+    arrivals = [eta + ARRIVAL_POLL_GRACE for eta in journey_etas(df_user) if eta + ARRIVAL_POLL_GRACE > now]
+    interval = IN_TRANSIT_POLL_INTERVAL if arrivals else IDLE_POLL_INTERVAL
+    return min([now + interval, *arrivals])
+
+
+class PollSchedule:
+    """ The next time each DF user is due to be polled for notifications. Users who haven't been polled yet are due. """
+    def __init__(self):
+        self._next_poll: dict[str, datetime] = {}
+
+    def is_due(self, df_user: dict, now: datetime) -> bool:
+        next_poll = self._next_poll.get(str(df_user['user_id']))
+        return next_poll is None or next_poll <= now
+
+    def polled(self, df_user: dict, now: datetime):
+        """ Record that a user was just polled, scheduling their next poll """
+        self._next_poll[str(df_user['user_id'])] = next_poll_at(df_user, now)
+
+    def refresh(self, df_user: dict, now: datetime):
+        """ Bring a user's next poll forward if fresh user data (e.g. a new journey) calls for it sooner """
+        user_key = str(df_user['user_id'])
+        if user_key in self._next_poll:
+            self._next_poll[user_key] = min(self._next_poll[user_key], next_poll_at(df_user, now))
+
+    def expect_arrival(self, user_id: UUID, eta: str | datetime):
+        """ Make sure a user is polled just after a journey they've just started arrives """
+        eta = eta if isinstance(eta, datetime) else datetime.fromisoformat(eta)
+        arrival_poll = (eta if eta.tzinfo else eta.replace(tzinfo=UTC)) + ARRIVAL_POLL_GRACE
+        user_key = str(user_id)
+        if user_key in self._next_poll:
+            self._next_poll[user_key] = min(self._next_poll[user_key], arrival_poll)
+
+    def poll_soon(self, user_id: UUID):
+        """ Make a user due for polling right away """
+        self._next_poll.pop(str(user_id), None)
+
+    def retain(self, user_ids: set[str]):
+        """ Forget users who are no longer cached """
+        for user_key in self._next_poll.keys() - user_ids:
+            del self._next_poll[user_key]
+
+
+notification_poll_schedule = PollSchedule()
@@ -0,0 +1,105 @@
+# SPDX-FileCopyrightText: 2024-present Oori Data <info@oori.dev>
+# SPDX-License-Identifier: UNLICENSED
+import                                os
+import                                hmac
+import                                logging
+from typing                    import Callable
+
+from aiohttp                   import web, WSMsgType
+
+from utiloori.ansi_color       import ansi_color
+
+# Leave the port unset to rely on polling alone
+PUSH_RECEIVER_PORT = int(os.environ['DF_PUSH_RECEIVER_PORT']) if os.environ.get('DF_PUSH_RECEIVER_PORT') else None
+PUSH_RECEIVER_HOST = os.environ.get('DF_PUSH_RECEIVER_HOST', '127.0.0.1')
+PUSH_RECEIVER_TOKEN = os.environ.get('DF_PUSH_RECEIVER_TOKEN')  # If set, publishers must send it as a bearer token
+
+DIALOGUE_EVENT_PATH = '/events/dialogue'  # POST one event per request
+DIALOGUE_EVENT_WS_PATH = '/events/ws'  # Or keep a WebSocket open and send one event per text message
+
+logger = logging.getLogger('DF_Discord')
+
+
+def parse_dialogue_event(event: dict) -> list[str]:
+    """ The DF user IDs a "new dialogue" event is about. Events look like `{'user_id': ...}` or `{'user_ids': [...]}`. """
+    if not isinstance(event, dict):
+        raise ValueError('Event must be a JSON object')
+    if 'user_ids' in event:
+        user_ids = event['user_ids']
+        if not isinstance(user_ids, list):
+            raise ValueError('`user_ids` must be a list')
+    elif 'user_id' in event:
+        user_ids = [event['user_id']]
+    else:
+        raise ValueError('Event must have a `user_id` or `user_ids`')
+    return [str(user_id) for user_id in user_ids]
+
+
+class PushReceiver:
+    """
+    A small local HTTP/WebSocket server the DF API can push "new dialogue for user X" events to.
+    Events are handed to `on_dialogue` as lists of DF user IDs; delivery itself is left to the notifier.
+    """
+    def __init__(
+            self,
+            on_dialogue: Callable[[list[str]], None],
+            host: str = PUSH_RECEIVER_HOST,
+            port: int | None = PUSH_RECEIVER_PORT,
+            token: str | None = PUSH_RECEIVER_TOKEN
+    ):
+        self.on_dialogue = on_dialogue
+        self.host = host
+        self.port = port
+        self.token = token
+        self.app = web.Application()
+        self.app.router.add_post(DIALOGUE_EVENT_PATH, self.handle_post)
+        self.app.router.add_get(DIALOGUE_EVENT_WS_PATH, self.handle_ws)
+        self._runner: web.AppRunner | None = None
+
+    def _authorized(self, request: web.Request) -> bool:
+        if not self.token:
+            return True
+        return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {self.token}')
+
+    async def handle_post(self, request: web.Request) -> web.Response:
+        if not self._authorized(request):
+            return web.json_response({'detail': 'Unauthorized'}, status=401)
+        try:
+            user_ids = parse_dialogue_event(await request.json())
+        except ValueError as e:  # Includes malformed JSON
+            return web.json_response({'detail': str(e)}, status=400)
+
+        self.on_dialogue(user_ids)
+        return web.json_response({'accepted': len(user_ids)}, status=202)
+
+    async def handle_ws(self, request: web.Request) -> web.WebSocketResponse:
+        if not self._authorized(request):
+            raise web.HTTPUnauthorized()
+
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        logger.info(ansi_color(f'Push publisher connected from {request.remote}', 'cyan'))
+        async for msg in ws:
+            if msg.type == WSMsgType.TEXT:
+                try:
+                    user_ids = parse_dialogue_event(msg.json())
+                except ValueError as e:
+                    await ws.send_json({'detail': str(e)})
+                    continue
+                self.on_dialogue(user_ids)
+            elif msg.type == WSMsgType.ERROR:
+                logger.error(ansi_color(f'Push publisher connection error: {ws.exception()}', 'red'))
+        logger.info(ansi_color(f'Push publisher disconnected from {request.remote}', 'cyan'))
+        return ws
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(ansi_color(f'Listening for pushed dialogue events on {self.host}:{self.port}', 'purple'))
+
+    async def close(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+            logger.info(ansi_color('Closed push receiver', 'yellow'))
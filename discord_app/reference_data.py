@@ -0,0 +1,73 @@
+# SPDX-FileCopyrightText: 2024-present Oori Data <info@oori.dev>
+# SPDX-License-Identifier: UNLICENSED
+import                                os
+import                                asyncio
+import                                logging
+from datetime                  import datetime, timedelta, UTC
+from typing                    import Any, Awaitable, Callable
+
+from utiloori.ansi_color       import ansi_color
+
+from discord_app               import api_calls
+
+REFERENCE_DATA_TTL = timedelta(minutes=int(os.environ.get('DF_REFERENCE_DATA_TTL_MINUTES', '60')))
+
+logger = logging.getLogger('DF_Discord')
+
+
+class ReferenceData:
+    """ Rarely-changing API data, kept in memory and refreshed in the background once it goes stale. """
+    def __init__(self, name: str, fetch: Callable[[], Awaitable[Any]], ttl: timedelta = REFERENCE_DATA_TTL):
+        self.name = name
+        self.fetch = fetch
+        self.ttl = ttl
+        self.value = None
+        self.refreshed_at: datetime | None = None
+        self._refresh_task: asyncio.Task | None = None
+
+    @property
+    def age(self) -> timedelta | None:
+        """ Time since the last successful refresh, or `None` if the data has never been loaded. """
+        return datetime.now(UTC) - self.refreshed_at if self.refreshed_at else None
+
+    @property
+    def is_stale(self) -> bool:
+        return self.refreshed_at is None or self.age > self.ttl
+
+    async def refresh(self):
+        """ Re-fetch the data. Concurrent refreshes share one request. """
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+        await asyncio.shield(self._refresh_task)
+
+    async def _refresh(self):
+        self.value = await self.fetch()
+        self.refreshed_at = datetime.now(UTC)
+        logger.debug(ansi_color(f'Refreshed reference data: {self.name}', 'cyan'))
+
+    async def get(self):
+        """ Get the data, only waiting on the API if it has never been loaded. Stale data is served while it refreshes. """
+        if self.value is None:
+            await self.refresh()
+        elif self.is_stale and (self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_task = asyncio.create_task(self._refresh())
+            self._refresh_task.add_done_callback(self._log_failed_refresh)
+        return self.value
+
+    def _log_failed_refresh(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception():
+            logger.error(ansi_color(f'Error refreshing reference data {self.name}: {task.exception()}', 'red'))
+
+
+resource_weights = ReferenceData('resource_weights', api_calls.resource_weights)
+
+ALL_REFERENCE_DATA = [resource_weights]
+
+
+async def refresh_all():
+    """ Refresh every piece of reference data, logging (rather than raising) failures so stale data keeps being served. """
+    for reference_data in ALL_REFERENCE_DATA:
+        try:
+            await reference_data.refresh()
+        except Exception as e:
+            logger.error(ansi_color(f'Error refreshing reference data {reference_data.name}: {e}', 'red'))
@@ -8,7 +8,7 @@ import                                discord
 from utiloori.ansi_color       import ansi_color
 
 from discord_app               import (
-    api_calls, handle_timeout, df_embed_author, add_tutorial_embed, get_user_metadata, validate_interaction,
+    api_calls, map_cache, handle_timeout, df_embed_author, add_tutorial_embed, get_user_metadata, validate_interaction,
     DF_LOGO_EMOJI, get_vendor_emoji, split_description_into_embeds
 )
 from discord_app.map_rendering import add_map_to_embed
@@ -29,9 +29,11 @@ async def sett_menu(df_state: DFState, follow_on_embeds: list[discord.Embed] | N
     sett_embed = discord.Embed()
     sett_embed = df_embed_author(sett_embed, df_state)
 
-    tile_obj = await api_calls.get_tile(
+    tile_obj = await map_cache.get_tile(
+        map_obj=df_state.map_obj,
         x=df_state.convoy_obj['x'],
         y=df_state.convoy_obj['y'],
+        fields=('settlements', 'vendors'),  # Vendor inventories need to be fresh
         user_id=df_state.user_obj['user_id']
     )
     if not tile_obj['settlements']:
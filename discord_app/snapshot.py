@@ -0,0 +1,76 @@
+# SPDX-FileCopyrightText: 2024-present Oori Data <info@oori.dev>
+# SPDX-License-Identifier: UNLICENSED
+import                                os
+import                                mmap
+import                                json
+import                                asyncio
+import                                logging
+
+from utiloori.ansi_color       import ansi_color
+
+from df_lib.map_struct         import serialize_map, deserialize_map
+
+SNAPSHOT_DIR = os.environ.get('DF_SNAPSHOT_DIR', '.snapshot')
+MAP_SNAPSHOT_PATH = os.path.join(SNAPSHOT_DIR, 'map.bin')
+USERS_SNAPSHOT_PATH = os.path.join(SNAPSHOT_DIR, 'users.json')
+
+logger = logging.getLogger('DF_Discord')
+
+
+def _write_atomically(path: str, data: bytes):
+    """ Write `data` to `path` via a temp file, so a crash mid-write never leaves a torn snapshot behind. """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())  # Make sure the data is on disk before the rename can be
+    os.replace(tmp_path, path)
+
+
+def load_map() -> dict | None:
+    """ Load the last good map from disk, or `None` if there isn't a usable one. """
+    try:
+        with open(MAP_SNAPSHOT_PATH, 'rb') as f:
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return deserialize_map(mapped)
+            except ValueError:  # Can't mmap an empty file
+                return None
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.error(ansi_color(f'Could not load map snapshot, ignoring it: {e}', 'red'))
+        return None
+
+
+def load_users() -> list[dict] | None:
+    """ Load the last good list of DF users from disk, or `None` if there isn't a usable one. """
+    try:
+        with open(USERS_SNAPSHOT_PATH, 'rb') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.error(ansi_color(f'Could not load users snapshot, ignoring it: {e}', 'red'))
+        return None
+
+
+async def save_map(map_obj: dict):
+    """ Persist `map_obj` as the last good map, writing it to disk without blocking the event loop. """
+    try:
+        # Serialize here on the event loop, which is the only thing that mutates the map (e.g. banners being set on
+        # settlements); a worker thread could catch it mid-change and write a torn snapshot, or fail outright
+        map_bytes = serialize_map(map_obj)
+        await asyncio.to_thread(_write_atomically, MAP_SNAPSHOT_PATH, map_bytes)
+    except Exception as e:
+        logger.error(ansi_color(f'Could not save map snapshot: {e}', 'red'))
+
+
+async def save_users(users: list[dict]):
+    """ Persist `users` as the last good list of DF users, writing it to disk without blocking the event loop. """
+    try:
+        users_bytes = json.dumps(users, default=str).encode()  # On the event loop, for the same reason as in `save_map`
+        await asyncio.to_thread(_write_atomically, USERS_SNAPSHOT_PATH, users_bytes)
+    except Exception as e:
+        logger.error(ansi_color(f'Could not save users snapshot: {e}', 'red'))
@@ -1,13 +1,23 @@
 # SPDX-FileCopyrightText: 2024-present Oori Data <info@oori.dev>
 # SPDX-License-Identifier: UNLICENSED
 'Vendor Menus'
+import                  os
 import                  math
+import                  asyncio
+from collections        import OrderedDict
 from datetime           import datetime, timezone, timedelta
 
 import discord
 
-from discord_app import api_calls, DFState, get_vehicle_emoji, split_description_into_embeds
+from discord_app import api_calls, map_cache, DFState, get_vehicle_emoji, split_description_into_embeds
 
+ENRICHMENT_CONCURRENCY = int(os.environ.get('DF_ENRICHMENT_CONCURRENCY', '8'))  # Max concurrent API calls per cargo listing
+COMPATIBILITY_CACHE_MAX_SIZE = int(os.environ.get('DF_COMPATIBILITY_CACHE_MAX_SIZE', '4096'))
+
+# (vehicle_id, vehicle's installed part IDs, part_cargo_id) -> compatibilities, or the `PartIncompatibleError`
+# Keying on the installed parts means an entry stops being used as soon as that vehicle's parts change
+# Failed checks aren't cached, so a passing API hiccup doesn't leave a pair looking incompatible
+_compatibility_cache: OrderedDict[tuple, list[dict] | api_calls.PartIncompatibleError] = OrderedDict()
 
 
 def vehicles_md(vehicles, verbose: bool = False):
@@ -105,27 +115,31 @@ async def format_cargo(df_state: DFState, *, verbose: bool, vendor: bool = False
     """ Format the vendor's cargo inventory into markdown """
     vendor_obj = df_state.vendor_obj
     convoy_obj = df_state.convoy_obj
-    cargo_list = []
 
+    displayed_cargo = []
     for cargo in vendor_obj['cargo_inventory']:
         update_wet_unit_price(cargo, vendor_obj)
 
         if is_cargo_invalid(cargo, vendor_obj):
             continue
 
+        displayed_cargo.append(cargo)
+
+    if verbose:
+        await enrich_cargo(df_state, displayed_cargo)
+
+    cargo_list = []
+    for cargo in displayed_cargo:
         cargo_str = format_basic_cargo(cargo)
 
-        if cargo['recipient'] and verbose:
-            await enrich_delivery_info(df_state, cargo)
-            if cargo.get('recipient_vendor'):
-                cargo_str += format_delivery_info(cargo)
+        if cargo['recipient'] and verbose and cargo.get('recipient_vendor'):
+            cargo_str += format_delivery_info(cargo)
 
         if vendor:
             cargo_str += format_clearance_info(cargo)
 
         # Add parts info if applicable and verbose
         if verbose and cargo.get('parts'):
-            await enrich_parts_compatibility(convoy_obj, cargo)
             cargo_str += format_parts_compatibility(convoy_obj, cargo, verbose=verbose)
 
         cargo_list.append(cargo_str)
@@ -184,22 +198,51 @@ def format_basic_cargo(cargo: dict) -> str:
     return cargo_str
 
 
+async def enrich_cargo(df_state: DFState, cargo_list: list[dict]) -> None:
+    """ Attach delivery and parts compatibility info to all of `cargo_list` at once.
+    All of the lookups are fanned out together, and each recipient vendor is only looked up once. """
+    deliverable_cargo = [cargo for cargo in cargo_list if cargo['recipient']]
+    part_cargo = [cargo for cargo in cargo_list if cargo.get('parts')]
+    recipient_ids = list(dict.fromkeys(
+        cargo['recipient'] for cargo in deliverable_cargo
+        if not cargo.get('recipient_vendor')
+    ))
+
+    semaphore = asyncio.Semaphore(ENRICHMENT_CONCURRENCY)  # One limit across the vendor lookups and compatibility checks
+
+    async def get_recipient_vendor(recipient_id: str) -> dict:
+        async with semaphore:
+            return await api_calls.get_vendor(vendor_id=recipient_id, user_id=df_state.user_obj['user_id'], identity_only=True)
+
+    fetched_recipient_vendors, _ = await asyncio.gather(
+        asyncio.gather(*(get_recipient_vendor(recipient_id) for recipient_id in recipient_ids)),
+        enrich_parts_compatibility_matrix(df_state.convoy_obj, part_cargo, semaphore=semaphore)
+    )
+    recipient_vendors = dict(zip(recipient_ids, fetched_recipient_vendors))
+
+    for cargo in deliverable_cargo:
+        if not cargo.get('recipient_vendor'):
+            cargo['recipient_vendor'] = recipient_vendors[cargo['recipient']]
+        attach_delivery_location(df_state, cargo)
+
+
 async def enrich_delivery_info(df_state: DFState, cargo: dict) -> None:
     """ Attach vendor and location info to deliverable cargo """
     if not cargo.get('recipient_vendor'):
         cargo['recipient_vendor'] = await api_calls.get_vendor(
             vendor_id=cargo['recipient'],
-            user_id=df_state.user_obj['user_id']
+            user_id=df_state.user_obj['user_id'],
+            identity_only=True  # Only the recipient's settlement and position are needed
         )
 
+    attach_delivery_location(df_state, cargo)
+
+
+def attach_delivery_location(df_state: DFState, cargo: dict) -> None:
+    """ Attach the recipient's settlement name and the vendor's (source) position to deliverable cargo """
     if cargo.get('recipient_vendor'):
-        cargo['recipient_location'] = next((
-            s['name']
-            for row in df_state.map_obj['tiles']
-            for t in row
-            for s in t['settlements']
-            if s['sett_id'] == cargo['recipient_vendor']['sett_id']
-        ), None)
+        recipient_sett = map_cache.map_index(df_state.map_obj).settlements_by_id.get(cargo['recipient_vendor']['sett_id'])
+        cargo['recipient_location'] = recipient_sett['name'] if recipient_sett else None
 
     # Add vendor's (source) position too — needed for distance calculation later
     cargo['vendor_x'] = df_state.vendor_obj['x']
@@ -271,18 +314,50 @@ def format_clearance_info(cargo: dict) -> str:
     return ''  # Not on sale or an error occurred
 
 
-async def enrich_parts_compatibility(convoy_obj: dict, cargo: dict) -> None:
-    """ Attach parts compatibility check results to cargo """
-    cargo['compatibilities'] = {}
-    for vehicle in convoy_obj['vehicles']:
-        try:
-            cargo['compatibilities'][vehicle['vehicle_id']] = await api_calls.check_part_compatibility(
-                vehicle_id=vehicle['vehicle_id'],
-                part_cargo_id=cargo['cargo_id'],
-                user_id=convoy_obj['user_id']
-            )
-        except RuntimeError as e:
-            cargo['compatibilities'][vehicle['vehicle_id']] = e
+def _compatibility_key(vehicle: dict, part_cargo_id: str) -> tuple:
+    installed_part_ids = tuple(sorted(part['part_id'] for part in vehicle.get('parts', [])))
+    return vehicle['vehicle_id'], installed_part_ids, part_cargo_id
+
+
+async def enrich_parts_compatibility_matrix(
+        convoy_obj: dict,
+        part_cargo: list[dict],
+        semaphore: asyncio.Semaphore | None = None
+) -> None:
+    """ Attach parts compatibility check results to each of `part_cargo`, for every vehicle in the convoy.
+    Only the (vehicle, part) pairs which aren't already cached are checked, all in one batch, limited by `semaphore`
+    if given. """
+    compatibilities = {}
+    uncached_pairs = []
+    for cargo in part_cargo:
+        for vehicle in convoy_obj['vehicles']:
+            key = _compatibility_key(vehicle, cargo['cargo_id'])
+            if key in _compatibility_cache:
+                compatibilities[key] = _compatibility_cache[key]
+                _compatibility_cache.move_to_end(key)
+            else:
+                uncached_pairs.append((vehicle, cargo['cargo_id']))
+
+    if uncached_pairs:
+        matrix = await api_calls.check_parts_compatibility(
+            vehicle_ids=list(dict.fromkeys(vehicle['vehicle_id'] for vehicle, _ in uncached_pairs)),
+            part_cargo_ids=list(dict.fromkeys(part_cargo_id for _, part_cargo_id in uncached_pairs)),
+            user_id=convoy_obj['user_id'],
+            semaphore=semaphore
+        )
+        for vehicle, part_cargo_id in uncached_pairs:
+            key = _compatibility_key(vehicle, part_cargo_id)
+            result = compatibilities[key] = matrix[vehicle['vehicle_id']][part_cargo_id]
+            if isinstance(result, api_calls.PartIncompatibleError) or not isinstance(result, RuntimeError):
+                _compatibility_cache[key] = result  # Only real answers; failed checks are retried next time
+        while len(_compatibility_cache) > COMPATIBILITY_CACHE_MAX_SIZE:
+            _compatibility_cache.popitem(last=False)  # Evict the least recently used entries
+
+    for cargo in part_cargo:
+        cargo['compatibilities'] = {
+            vehicle['vehicle_id']: compatibilities[_compatibility_key(vehicle, cargo['cargo_id'])]
+            for vehicle in convoy_obj['vehicles']
+        }
 
 
 def format_parts_compatibility(convoy_obj: dict, cargo: dict, verbose: bool = False) -> str:
@@ -292,10 +367,14 @@ def format_parts_compatibility(convoy_obj: dict, cargo: dict, verbose: bool = Fa
         compatibilities = cargo['compatibilities'].get(vehicle['vehicle_id'])
         parts_info += f'\n  - {get_vehicle_emoji(vehicle['shape'])} | {vehicle['name']} | '
 
-        if isinstance(compatibilities, RuntimeError):
+        if isinstance(compatibilities, api_calls.PartIncompatibleError):
             parts_info += '❌ Incompatible'
             if verbose:
                 parts_info += f': *{compatibilities}*'
+        elif isinstance(compatibilities, RuntimeError):
+            parts_info += '⚠️ Could not check compatibility'
+            if verbose:
+                parts_info += f': *{compatibilities}*'
         else:
             total_installation_price = cargo['unit_price'] + sum(vp['installation_price'] for vp in compatibilities)
             parts_info += f'✅ Total installation price: **${total_installation_price:,.0f}**'
@@ -11,7 +11,7 @@ from discord_app               import (
     api_calls, handle_timeout, df_embed_author, validate_interaction, get_vehicle_emoji, split_description_into_embeds,
     create_paginated_select_options
 )
-from discord_app.vendor_menus  import enrich_parts_compatibility, format_parts_compatibility, format_basic_cargo
+from discord_app.vendor_menus  import enrich_parts_compatibility_matrix, format_parts_compatibility, format_basic_cargo
 import discord_app.nav_menus
 import discord_app.vehicle_menus
 import discord_app.cargo_menus
@@ -34,12 +34,18 @@ async def mechanic_menu(df_state: DFState):
 
     embeds = [mech_embed]
 
+    await enrich_parts_compatibility_matrix(  # Check every part against every vehicle in one go
+        df_state.convoy_obj,
+        [
+            cargo for cargo in df_state.convoy_obj['all_cargo'] + df_state.vendor_obj['cargo_inventory']
+            if cargo.get('parts')
+        ]
+    )
+
     convoy_parts = []
     for cargo in df_state.convoy_obj['all_cargo']:
         if cargo.get('parts'):
             cargo_str = f'- **{cargo['name']}**'
-
-            await enrich_parts_compatibility(df_state.convoy_obj, cargo)
             cargo_str += format_parts_compatibility(df_state.convoy_obj, cargo)
 
             convoy_parts.append(cargo_str)
@@ -53,8 +59,6 @@ async def mechanic_menu(df_state: DFState):
     for cargo in df_state.vendor_obj['cargo_inventory']:
         if cargo.get('parts'):
             cargo_str = format_basic_cargo(cargo)
-
-            await enrich_parts_compatibility(df_state.convoy_obj, cargo)
             cargo_str += format_parts_compatibility(df_state.convoy_obj, cargo)
 
             vendor_parts.append(cargo_str)
@@ -270,22 +274,25 @@ async def part_inventory_menu(df_state: DFState, is_vendor: bool=False, page: in
     incompatible_part_cargo_strs = []
     compatible_part_cargo_list = []  # Stores cargo dicts that are compatible
 
+    # Ensure 'compatibilities' key is present on every part, in-place. The matrix is cached, so paging through this
+    # menu doesn't re-check anything unless the convoy's vehicles' parts have changed.
+    await enrich_parts_compatibility_matrix(
+        df_state.convoy_obj,
+        [c for c in source_inventory if c.get('parts')]
+    )
+
     for current_cargo_item in source_inventory:
         # For vendor inventory, ensure it's a part. Convoy inventory is pre-filtered.
         if is_vendor and not current_cargo_item.get('parts'):
             continue
 
-        # Ensure 'compatibilities' key is present by calling enrich_parts_compatibility.
-        # This modifies 'current_cargo_item' in-place.
-        await enrich_parts_compatibility(df_state.convoy_obj, current_cargo_item)
-
         # Get the compatibility result for the currently selected vehicle
         vehicle_specific_compatibilities = current_cargo_item['compatibilities'].get(df_state.vehicle_obj['vehicle_id'])
 
         if isinstance(vehicle_specific_compatibilities, RuntimeError):
             incompatible_part_cargo_strs.append('\n'.join([
                 f'- {current_cargo_item['name']}',
-                f'  - ❌ *{vehicle_specific_compatibilities!s}*'
+                f'  - {'❌' if isinstance(vehicle_specific_compatibilities, api_calls.PartIncompatibleError) else '⚠️'} *{vehicle_specific_compatibilities!s}*'
             ]))
         elif vehicle_specific_compatibilities:  # Check if the list of configurations is not empty
             compatible_part_cargo_list.append(current_cargo_item)
@@ -9,7 +9,7 @@ from utiloori.ansi_color       import ansi_color
 
 from discord_app               import (
     api_calls, handle_timeout, df_embed_author, get_user_metadata, validate_interaction, get_cargo_emoji,
-    split_description_into_embeds
+    split_description_into_embeds, run_bulk_operation, bulk_failures_md
 )
 from discord_app.map_rendering import add_map_to_embed
 import discord_app.nav_menus
@@ -480,29 +480,22 @@ class SellAllCargoButton(discord.ui.Button):
     def __init__(self, df_state: DFState, row: int = 1):
         self.df_state = df_state
 
-        if self.df_state.cargo_obj['recipient'] == self.df_state.vendor_obj['vendor_id']:  # Delivery cargo
+        self.delivery = self.df_state.cargo_obj['recipient'] == self.df_state.vendor_obj['vendor_id']
+        if self.delivery:  # Delivery cargo
             self.sell_list = [
                 cargo
                 for cargo in self.df_state.convoy_obj['all_cargo']
                 if cargo['class_id'] == self.df_state.cargo_obj['class_id']
                 and cargo['recipient'] == self.df_state.vendor_obj['vendor_id']
             ]
-            self.sale_quantity = sum(cargo['quantity'] for cargo in self.sell_list)
-            self.sale_price = sum(
-                cargo['quantity'] * cargo['unit_delivery_reward']
-                for cargo in self.sell_list
-            )
         else:  # Normal cargo
             self.sell_list = [
                 cargo
                 for cargo in self.df_state.convoy_obj['all_cargo']
                 if cargo['class_id'] == self.df_state.cargo_obj['class_id']
             ]
-            self.sale_quantity = sum(cargo['quantity'] for cargo in self.sell_list)
-            self.sale_price = sum(
-                cargo['quantity'] * wet_price(cargo, self.df_state.vendor_obj, quantity=1)
-                for cargo in self.sell_list
-            )
+        self.sale_quantity = sum(cargo['quantity'] for cargo in self.sell_list)
+        self.sale_price = sum(self.stack_price(cargo) for cargo in self.sell_list)
 
         # Truncate cargo name if label is too long
         cargo_name_original = self.df_state.cargo_obj['name']
@@ -530,37 +523,62 @@ class SellAllCargoButton(discord.ui.Button):
             row=row
         )
 
+    def stack_price(self, cargo: dict) -> float:
+        if self.delivery:
+            return cargo['quantity'] * cargo['unit_delivery_reward']
+        return cargo['quantity'] * wet_price(cargo, self.df_state.vendor_obj, quantity=1)
+
     async def callback(self, interaction: discord.Interaction):
         if not await validate_interaction(interaction=interaction, df_state=self.df_state):
             return
         self.df_state.interaction = interaction
 
-        try:
-            for cargo in self.sell_list:
-                self.df_state.convoy_obj = await api_calls.sell_cargo(
-                    vendor_id=self.df_state.vendor_obj['vendor_id'],
+        await interaction.response.defer()  # Selling every stack can outlast the interaction window
+
+        async def sell_stack(cargo: dict) -> dict:
+            return await api_calls.sell_cargo(
+                vendor_id=self.df_state.vendor_obj['vendor_id'],
+                convoy_id=self.df_state.convoy_obj['convoy_id'],
+                cargo_id=cargo['cargo_id'],
+                quantity=cargo['quantity'],
+                user_id=self.df_state.user_obj['user_id']
+            )
+
+        succeeded, failed = await run_bulk_operation(self.sell_list, sell_stack)
+
+        if len(succeeded) == 1:
+            self.df_state.convoy_obj = succeeded[0][1]
+        elif succeeded:  # The sales finish in any order, so none of their results is sure to include all of them
+            api_calls.invalidate_convoy(self.df_state.convoy_obj['convoy_id'])
+            try:
+                self.df_state.convoy_obj = await api_calls.get_convoy(
                     convoy_id=self.df_state.convoy_obj['convoy_id'],
-                    cargo_id=cargo['cargo_id'],
-                    quantity=cargo['quantity'],
                     user_id=self.df_state.user_obj['user_id']
                 )
-        except RuntimeError as e:
-            await interaction.response.send_message(content=e, ephemeral=True)
-            return
+            except RuntimeError as e:
+                await interaction.followup.send(content=e, ephemeral=True)
+                return
+
+        sold_quantity = sum(cargo['quantity'] for cargo, _ in succeeded)
+        sold_price = sum(self.stack_price(cargo) for cargo, _ in succeeded)
 
         embed = discord.Embed()
         embed = df_embed_author(embed, self.df_state)
         desc = [f'## {self.df_state.vendor_obj['name']}']
 
-        if self.df_state.cargo_obj['recipient'] == self.df_state.vendor_obj['vendor_id']:
-            desc.append(f'Delivered {self.sale_quantity} {self.df_state.cargo_obj['name']}(s) for ${self.sale_price:,.0f}')
+        if self.delivery:
+            desc.append(f'Delivered {sold_quantity} {self.df_state.cargo_obj['name']}(s) for ${sold_price:,.0f}')
         else:
-            desc.append(f'Sold {self.sale_quantity} {self.df_state.cargo_obj['name']}(s) for ${self.sale_price:,.0f}')
+            desc.append(f'Sold {sold_quantity} {self.df_state.cargo_obj['name']}(s) for ${sold_price:,.0f}')
+
+        if failed:
+            desc.append(f'### Could not {'deliver' if self.delivery else 'sell'}')
+            desc.append(bulk_failures_md(failed))
 
         embed.description = '\n'.join(desc)
         view = PostSellView(self.df_state)
 
-        await interaction.response.edit_message(embed=embed, view=view)
+        await interaction.edit_original_response(embed=embed, view=view)
 
 def calculate_total_cargo_price(cargo: dict, vendor_obj: dict) -> float:
     """ Calculate the sale price for a single cargo item including resource values. """
@@ -8,8 +8,9 @@ import                                discord
 from utiloori.ansi_color       import ansi_color
 
 from discord_app               import (
-    api_calls, handle_timeout, df_embed_author, add_tutorial_embed, validate_interaction, get_user_metadata,
-    get_vehicle_emoji, get_cargo_emoji, create_paginated_select_options, split_description_into_embeds
+    api_calls, map_cache, handle_timeout, df_embed_author, add_tutorial_embed, validate_interaction, get_user_metadata,
+    get_vehicle_emoji, get_cargo_emoji, create_paginated_select_options, split_description_into_embeds,
+    run_bulk_operation, bulk_failures_md
 )
 from discord_app.map_rendering import add_map_to_embed
 import                                discord_app.vendor_menus.vendor_menus
@@ -73,7 +74,9 @@ async def warehoused(df_state: DFState, edit: bool):
 
     view = WarehouseView(df_state)
 
-    if edit:
+    if edit and df_state.interaction.response.is_done():  # Deferred, e.g. by a bulk store/retrieve
+        await df_state.interaction.edit_original_response(embeds=embeds, view=view, attachments=[])
+    elif edit:
         await df_state.interaction.response.edit_message(embeds=embeds, view=view, attachments=[])
     else:
         await df_state.interaction.followup.send(embeds=embeds, view=view)
@@ -109,7 +112,8 @@ async def warehouse_cargo_md(warehouse_obj, verbose: bool = False) -> str:
             if cargo['recipient']:
                 cargo['recipient_vendor'] = await api_calls.get_vendor(
                     vendor_id=cargo['recipient'],
-                    user_id=warehouse_obj['user_id']
+                    user_id=warehouse_obj['user_id'],
+                    identity_only=True
                 )
                 cargo_str += f'\n  - Deliver to *{cargo['recipient_vendor']['name']}* | ***${cargo['unit_delivery_reward']:,.0f}*** *each*'
                 margin = min(round((cargo['unit_delivery_reward'] / cargo['unit_price']) / 2), 24)  # limit emojis to 24
@@ -138,6 +142,27 @@ def _get_cargo_by_class_id(item_source: list[dict], class_id: str) -> list[dict]
     """ Helper to filter cargo items by class_id. """
     return [cargo for cargo in item_source if cargo.get('class_id') == class_id and cargo.get('quantity', 0) > 0]
 
+def _apply_convoy_update(df_state: DFState, convoy_id: str, convoy_obj: dict | None):
+    """ Helper to swap an updated convoy into the local state, or drop it if it was disbanded (`convoy_obj` is `None`). """
+    df_state.user_obj['convoys'] = [
+        convoy_obj if convoy['convoy_id'] == convoy_id else convoy
+        for convoy in df_state.user_obj['convoys']
+        if convoy_obj is not None or convoy['convoy_id'] != convoy_id
+    ]
+    df_state.convoy_obj = convoy_obj
+
+async def _convoy_after_bulk_operation(df_state: DFState, succeeded: list[tuple[dict, dict]]) -> dict:
+    """ Helper to get the convoy as of every operation in a bulk store/retrieve. They finish in any order, so unless
+    there was only the one, none of their results is sure to include all of the changes. """
+    if len(succeeded) == 1:
+        return succeeded[0][1]
+
+    api_calls.invalidate_convoy(df_state.convoy_obj['convoy_id'])
+    return await api_calls.get_convoy(
+        convoy_id=df_state.convoy_obj['convoy_id'],
+        user_id=df_state.user_obj['user_id']
+    )
+
 class WarehouseView(discord.ui.View):
     def __init__(self, df_state: DFState):
         self.df_state = df_state
@@ -452,20 +477,15 @@ class StoreCargoSelect(discord.ui.Select):
         placeholder = 'Cargo which can be stored'
         disabled = False
 
-        vendor_mapping = {}
+        vendors_by_id = map_cache.map_index(self.df_state.map_obj).vendors_by_id
 
-        # Build vendor mapping
-        for r in self.df_state.map_obj['tiles']:
-            for tile in r:
-                for settlement in tile['settlements']:
-                    for vendor in settlement['vendors']:
-                        vendor_mapping[vendor['vendor_id']] = vendor['name']
         options = []
         for vehicle in df_state.convoy_obj['vehicles']:
             for cargo in vehicle['cargo']:
                 if not cargo['intrinsic_part_id']:
                     # Get vendor name or fallback if None
-                    vendor_name = f'| {vendor_mapping.get(cargo['recipient'], '')}'
+                    recipient_vendor = vendors_by_id.get(cargo['recipient'])
+                    vendor_name = f'| {recipient_vendor['name'] if recipient_vendor else ''}'
 
                     options.append(discord.SelectOption(
                         label=f'{cargo['name']} | {vehicle['name']} {vendor_name}',
@@ -655,7 +675,7 @@ class CargoConfirmStoreButton(discord.ui.Button):
         self.df_state.interaction = interaction
 
         try:
-            self.df_state.convoy_obj = await api_calls.store_cargo_in_warehouse(
+            updated_convoy_obj = await api_calls.store_cargo_in_warehouse(
                 warehouse_id=self.df_state.warehouse_obj['warehouse_id'],
                 convoy_id=self.df_state.convoy_obj['convoy_id'],
                 cargo_id=self.df_state.cargo_obj['cargo_id'],
@@ -666,17 +686,9 @@ class CargoConfirmStoreButton(discord.ui.Button):
             await interaction.response.send_message(content=e, ephemeral=True)
             return
 
-        # Re-fetch user_obj to get updated convoy list and money
-        self.df_state.user_obj = await api_calls.get_user(self.df_state.user_obj['user_id'])
-        # Re-fetch convoy_obj if it still exists
-        self.df_state.convoy_obj = next((c for c in self.df_state.user_obj['convoys'] if c['convoy_id'] == self.df_state.convoy_obj['convoy_id']), None)
-        # Re-fetch warehouse_obj for its updated inventory
-        self.df_state.warehouse_obj = await api_calls.get_warehouse(
-            self.df_state.warehouse_obj['warehouse_id'],
-            user_id=self.df_state.user_obj['user_id']
-        )
+        _apply_convoy_update(self.df_state, updated_convoy_obj['convoy_id'], updated_convoy_obj)
 
-        await warehouse_menu(self.df_state)
+        await warehouse_menu(self.df_state)  # Re-fetches warehouse_obj for its updated inventory
 
 class StoreAllCargoButton(discord.ui.Button):
     def __init__(self, df_state: DFState, row: int = 1):
@@ -716,28 +728,37 @@ class StoreAllCargoButton(discord.ui.Button):
             await interaction.response.send_message("Nothing to store.", ephemeral=True)
             return
 
-        for cargo_stack in self.sell_list:
+        await interaction.response.defer()  # Storing every stack can outlast the interaction window
+
+        async def store_stack(cargo_stack: dict) -> dict:
+            return await api_calls.store_cargo_in_warehouse(
+                warehouse_id=self.df_state.warehouse_obj['warehouse_id'],
+                convoy_id=self.df_state.convoy_obj['convoy_id'],
+                cargo_id=cargo_stack['cargo_id'],
+                quantity=cargo_stack['quantity'],  # Store the whole stack
+                user_id=self.df_state.user_obj['user_id']
+            )
+
+        succeeded, failed = await run_bulk_operation(self.sell_list, store_stack)
+
+        if succeeded:
             try:
-                await api_calls.store_cargo_in_warehouse(
-                    warehouse_id=self.df_state.warehouse_obj['warehouse_id'],
-                    convoy_id=self.df_state.convoy_obj['convoy_id'],
-                    cargo_id=cargo_stack['cargo_id'],
-                    quantity=cargo_stack['quantity']  # Store the whole stack
-                )
+                updated_convoy_obj = await _convoy_after_bulk_operation(self.df_state, succeeded)
             except RuntimeError as e:
-                await interaction.response.send_message(content=f'Error storing {cargo_stack['name']}: {e}', ephemeral=True)
-                # Potentially stop or continue, for now, we continue
-
-        # Re-fetch user_obj to get updated convoy list and money
-        self.df_state.user_obj = await api_calls.get_user(self.df_state.user_obj['user_id'])
-        # Re-fetch convoy_obj if it still exists
-        self.df_state.convoy_obj = next((c for c in self.df_state.user_obj['convoys'] if c['convoy_id'] == self.df_state.convoy_obj['convoy_id']), None)
-        # Re-fetch warehouse_obj for its updated inventory
-        self.df_state.warehouse_obj = await api_calls.get_warehouse(
-            warehouse_id=self.df_state.warehouse_obj['warehouse_id'],
-            user_id=self.df_state.user_obj['user_id']
-        )
-        await warehouse_menu(self.df_state)
+                await interaction.followup.send(content=e, ephemeral=True)
+                return
+            _apply_convoy_update(self.df_state, updated_convoy_obj['convoy_id'], updated_convoy_obj)
+        await warehouse_menu(self.df_state)  # Re-fetches warehouse_obj for its updated inventory
+
+        if failed:
+            stored_quantity = sum(cargo_stack['quantity'] for cargo_stack, _ in succeeded)
+            await interaction.followup.send(
+                content='\n'.join([
+                    f'Stored {stored_quantity:,} of {self.total_quantity_to_store:,} {self.df_state.cargo_obj['name']}(s). Could not store:',
+                    bulk_failures_md(failed)
+                ]),
+                ephemeral=True
+            )
 
 
 async def retrieve_cargo_menu(df_state: DFState, page: int = 0):
@@ -784,16 +805,12 @@ class RetrieveCargoSelect(discord.ui.Select):
         placeholder = 'Cargo which can be retrieved'
         disabled = False
 
-        vendor_mapping = {}
-        for r in self.df_state.map_obj['tiles']:  # Build vendor mapping
-            for tile in r:
-                for settlement in tile['settlements']:
-                    for vendor in settlement['vendors']:
-                        vendor_mapping[vendor['vendor_id']] = vendor['name']
+        vendors_by_id = map_cache.map_index(self.df_state.map_obj).vendors_by_id
 
         all_cargo_options = []
         for cargo in df_state.warehouse_obj['cargo_storage']:
-            vendor_name = f'| {vendor_mapping.get(cargo['recipient'], '')}'
+            recipient_vendor = vendors_by_id.get(cargo['recipient'])
+            vendor_name = f'| {recipient_vendor['name'] if recipient_vendor else ''}'
 
             all_cargo_options.append(discord.SelectOption(
                 label=f'{cargo['name']} {vendor_name}',
@@ -1022,7 +1039,7 @@ class CargoConfirmRetrieveButton(discord.ui.Button):
         self.df_state.interaction = interaction
 
         try:
-            self.df_state.convoy_obj = await api_calls.retrieve_cargo_from_warehouse(
+            updated_convoy_obj = await api_calls.retrieve_cargo_from_warehouse(
                 warehouse_id=self.df_state.warehouse_obj['warehouse_id'],
                 convoy_id=self.df_state.convoy_obj['convoy_id'],
                 cargo_id=self.df_state.cargo_obj['cargo_id'],
@@ -1033,18 +1050,9 @@ class CargoConfirmRetrieveButton(discord.ui.Button):
             await interaction.response.send_message(content=e, ephemeral=True)
             return
 
-        await warehouse_menu(self.df_state)
+        _apply_convoy_update(self.df_state, updated_convoy_obj['convoy_id'], updated_convoy_obj)
 
-        self.df_state.user_obj = await api_calls.get_user(self.df_state.user_obj['user_id'])
-        # Re-fetch convoy_obj if it still exists
-        self.df_state.convoy_obj = next((c for c in self.df_state.user_obj['convoys'] if c['convoy_id'] == self.df_state.convoy_obj['convoy_id']), None)
-        # Re-fetch warehouse_obj for its updated inventory
-        self.df_state.warehouse_obj = await api_calls.get_warehouse(
-            warehouse_id=self.df_state.warehouse_obj['warehouse_id'],
-            user_id=self.df_state.user_obj['user_id']
-        )
-
-        await warehouse_menu(self.df_state)
+        await warehouse_menu(self.df_state)  # Re-fetches warehouse_obj for its updated inventory
 
 class RetrieveAllCargoButton(discord.ui.Button):
     def __init__(self, df_state: DFState, row: int = 1):
@@ -1088,29 +1096,37 @@ class RetrieveAllCargoButton(discord.ui.Button):
             await interaction.response.send_message('Nothing to retrieve.', ephemeral=True)
             return
 
-        for cargo_stack in self.retrieve_list:
+        await interaction.response.defer()  # Retrieving every stack can outlast the interaction window
+
+        async def retrieve_stack(cargo_stack: dict) -> dict:
+            return await api_calls.retrieve_cargo_from_warehouse(
+                warehouse_id=self.df_state.warehouse_obj['warehouse_id'],
+                convoy_id=self.df_state.convoy_obj['convoy_id'],
+                cargo_id=cargo_stack['cargo_id'],
+                quantity=cargo_stack['quantity'],  # Retrieve the whole stack
+                user_id=self.df_state.user_obj['user_id']
+            )
+
+        succeeded, failed = await run_bulk_operation(self.retrieve_list, retrieve_stack)
+
+        if succeeded:
             try:
-                await api_calls.retrieve_cargo_from_warehouse(
-                    warehouse_id=self.df_state.warehouse_obj['warehouse_id'],
-                    convoy_id=self.df_state.convoy_obj['convoy_id'],
-                    cargo_id=cargo_stack['cargo_id'],
-                    quantity=cargo_stack['quantity'],  # Retrieve the whole stack
-                    user_id=self.df_state.user_obj['user_id']
-                )
+                updated_convoy_obj = await _convoy_after_bulk_operation(self.df_state, succeeded)
             except RuntimeError as e:
-                await interaction.response.send_message(content=f'Error retrieving {cargo_stack['name']}: {e}', ephemeral=True)
-                # Potentially stop or continue
-
-        # Re-fetch user_obj to get updated convoy list and money
-        self.df_state.user_obj = await api_calls.get_user(self.df_state.user_obj['user_id'])
-        # Re-fetch convoy_obj if it still exists
-        self.df_state.convoy_obj = next((c for c in self.df_state.user_obj['convoys'] if c['convoy_id'] == self.df_state.convoy_obj['convoy_id']), None)
-        # Re-fetch warehouse_obj for its updated inventory
-        self.df_state.warehouse_obj = await api_calls.get_warehouse(
-            warehouse_id=self.df_state.warehouse_obj['warehouse_id'],
-            user_id=self.df_state.user_obj['user_id']
-        )
-        await warehouse_menu(self.df_state)
+                await interaction.followup.send(content=e, ephemeral=True)
+                return
+            _apply_convoy_update(self.df_state, updated_convoy_obj['convoy_id'], updated_convoy_obj)
+        await warehouse_menu(self.df_state)  # Re-fetches warehouse_obj for its updated inventory
+
+        if failed:
+            retrieved_quantity = sum(cargo_stack['quantity'] for cargo_stack, _ in succeeded)
+            await interaction.followup.send(
+                content='\n'.join([
+                    f'Retrieved {retrieved_quantity:,} of {self.total_quantity_to_retrieve:,} {self.df_state.cargo_obj['name']}(s). Could not retrieve:',
+                    bulk_failures_md(failed)
+                ]),
+                ephemeral=True
+            )
 
 
 async def store_vehicle_menu(df_state: DFState):
@@ -1176,36 +1192,42 @@ class StoreVehicleSelect(discord.ui.Select):
             if v['vehicle_id'] == self.values[0]
         ), None)
 
+        convoy_id = self.df_state.convoy_obj['convoy_id']
         try:
             # API call to store the vehicle
-            await api_calls.store_vehicle_in_warehouse(
+            store_response = await api_calls.store_vehicle_in_warehouse(
                 warehouse_id=self.df_state.warehouse_obj['warehouse_id'],
-                convoy_id=self.df_state.convoy_obj['convoy_id'],
+                convoy_id=convoy_id,
                 vehicle_id=vehicle_to_store['vehicle_id'],
                 user_id=self.df_state.user_obj['user_id']
             )
-            # Re-fetch user_obj to get updated convoy list and money
-            self.df_state.user_obj = await api_calls.get_user(self.df_state.user_obj['user_id'])
-            # Re-fetch warehouse_obj for its updated inventory
-            self.df_state.warehouse_obj = await api_calls.get_warehouse(
-                warehouse_id=self.df_state.warehouse_obj['warehouse_id'],
-                user_id=self.df_state.user_obj['user_id']
-            )
 
-            # Check if the convoy still exists
-            updated_convoy_obj = next((c for c in self.df_state.user_obj['convoys'] if c['convoy_id'] == self.df_state.convoy_obj['convoy_id']), None)
-            self.df_state.convoy_obj = updated_convoy_obj
+            # Storing a convoy's last vehicle disbands it. Go by what the API says happened, not by the (possibly
+            # stale) local convoy: use the updated convoy if it answered with one, otherwise see if it still exists
+            if isinstance(store_response, dict) and store_response.get('convoy_id') == convoy_id:
+                updated_convoy_obj = store_response
+            else:
+                try:
+                    updated_convoy_obj = await api_calls.get_convoy(
+                        convoy_id=convoy_id,
+                        user_id=self.df_state.user_obj['user_id']
+                    )
+                except api_calls.ConvoyNotFoundError:
+                    updated_convoy_obj = None  # Disbanded
 
         except RuntimeError as e:
             await interaction.response.send_message(content=e, ephemeral=True)
             return
 
+        _apply_convoy_update(self.df_state, convoy_id, updated_convoy_obj)
+
         if self.df_state.convoy_obj:
             await warehouse_menu(self.df_state)  # Refresh warehouse menu with updated convoy
         else:
             # Convoy was disbanded, go to main menu
             await discord_app.main_menu_menus.main_menu(
                 interaction=self.df_state.interaction,
+                df_map=self.df_state.map_obj,
                 user_cache=self.df_state.user_cache,
             )
 
@@ -1283,13 +1305,9 @@ class RetrieveVehicleSelect(discord.ui.Select):
                 vehicle_id=vehicle_to_retrieve['vehicle_id'],
                 user_id=self.df_state.user_obj['user_id']
             )
-            # Re-fetch user_obj to get updated convoy list and money
-            self.df_state.user_obj = await api_calls.get_user(self.df_state.user_obj['user_id'])
-            # Re-fetch convoy_obj as it has been modified
-            self.df_state.convoy_obj = next((c for c in self.df_state.user_obj['convoys'] if c['convoy_id'] == self.df_state.convoy_obj['convoy_id']), None)
-             # Re-fetch warehouse_obj for its updated inventory
-            self.df_state.warehouse_obj = await api_calls.get_warehouse(
-                warehouse_id=self.df_state.warehouse_obj['warehouse_id'],
+            # Re-fetch just this convoy, as it has been modified
+            updated_convoy_obj = await api_calls.get_convoy(
+                convoy_id=self.df_state.convoy_obj['convoy_id'],
                 user_id=self.df_state.user_obj['user_id']
             )
 
@@ -1297,7 +1315,9 @@ class RetrieveVehicleSelect(discord.ui.Select):
             await interaction.response.send_message(content=e, ephemeral=True)
             return
 
-        await warehouse_menu(self.df_state)
+        _apply_convoy_update(self.df_state, updated_convoy_obj['convoy_id'], updated_convoy_obj)
+
+        await warehouse_menu(self.df_state)  # Re-fetches warehouse_obj for its updated inventory
 
 
 async def spawn_convoy_menu(df_state: DFState):
@@ -1454,6 +1474,7 @@ class BuyWarehouseButton(discord.ui.Button):
         self.df_state.user_obj['warehouses'].append(new_warehouse)
         self.df_state.warehouse_obj = new_warehouse
 
+        api_calls.invalidate_convoy(self.df_state.convoy_obj['convoy_id'])  # The convoy paid for the warehouse
         self.df_state.convoy_obj = await api_calls.get_convoy(
             convoy_id=self.df_state.convoy_obj['convoy_id'],
             user_id=self.df_state.user_obj['user_id']